@@ -0,0 +1,310 @@
+import os
+
+# --- STATIC ASSETS ---
+# Traduções e CSS carregados uma vez por processo (módulo importado uma vez); os reruns do
+# Streamlit só fazem a consulta ao dicionário e reenviam o <style> já montado.
+ASSETS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def _read(name):
+    with open(os.path.join(ASSETS_DIR, name), encoding="utf-8") as f: return f.read()
+
+CSS = f"<style>\n{_read('style.css')}</style>"
+
+# --- TRANSLATIONS (PT / EN / FR) ---
+LANG = {
+    "pt": {
+        "title": "Paulo Moura Dashboard",
+        "search_label": "Pesquisar",
+        "search_placeholder": "Ticker (Ex: O, AAPL...)",
+        "btn_search": "🔍",
+        "welcome_title": "👋 Bem-vindo!",
+        "welcome_msg": "Introduza o símbolo de uma ação (ex: <b>AAPL</b>, <b>KO</b>, <b>O</b>) para ver a análise fundamentalista.",
+        "try_ex": "Ou experimente:",
+        "loading": "A analisar",
+        "no_data": "Dados não encontrados ou erro de conexão.",
+        "price": "Preço",
+        "market_cap": "Valor de Mercado",
+        "yield": "Dividend Yield",
+        "profit_margin": "Margem Líquida",
+        # Metrics
+        "eps_trend": "Tendência EPS ($)",
+        "affo_trend": "Tendência AFFO ($)",
+        "cash_metric": "Fluxo de Caixa (Op/FCF)",
+        "rev_hist": "Histórico de Receita",
+        "gm_trend": "Margem Bruta (%)",
+        "ni_hist": "Lucro Líquido",
+        "ttm_title": "Últimos 12 meses (TTM até {q})",
+        "shares": "Ações em Circulação",
+        "debt": "Dívida Total",
+        "safety_score": "Scorecard de Segurança",
+        "net_debt": "Dívida Líq./EBITDA",
+        "int_cov": "Cob. de Juros",
+        "insider": "Transações Insiders",
+        "insider_detail": "Detalhe insiders (janelas e cargos)",
+        "solvency": "Solvência (Cash vs Dívida)",
+        "div_hist": "Histórico Dividendos",
+        "chowder": "Regra de Chowder",
+        "rev_growth": "Cresc. Receita",
+        "div_cagr": "Cresc. Div (5A)",
+        "consensus": "Consenso Wall St.",
+        "target": "Preço Alvo",
+        "news": "Últimas Notícias",
+        "auto_summary": "🤖 Análise Automática",
+        "bull": "Pontos Fortes",
+        "bear": "Pontos Fracos",
+        "comp_title": "Comparação com Competidores",
+        "comp_input": "Adicionar concorrentes (sep. por vírgula):",
+        # Insights Contextuais
+        "insight_premium": "💎 **Prémio de Qualidade detetado:** Os modelos clássicos (Graham/Lynch) indicam que a ação está cara, mas o **ROIC elevado (>15%)** sugere uma vantagem competitiva forte. O mercado paga frequentemente múltiplos mais altos por empresas de qualidade 'Premium' (Ex: Visa, Costco) do que os modelos conservadores sugerem.",
+        "insight_growth": "🚀 **Expectativa de Crescimento:** O P/E Ratio é muito elevado. Isto significa que o preço atual reflete lucros futuros muito agressivos. Os modelos de valorização baseados no presente vão falhar aqui.",
+        "insight_value": "📉 **Possível Subavaliação:** A ação parece barata nos modelos. Verifique se os lucros são estáveis. Se estiverem a cair, pode ser uma 'Armadilha de Valor'.",
+        "insight_neutral": "⚖️ **Valorização Standard:** O preço parece alinhar-se razoavelmente com os fundamentos de crescimento e lucro atuais.",
+        # Tooltips (Explicações)
+        "help_net_debt": "Mede quantos anos a empresa demoraria a pagar a dívida com o lucro operacional (EBITDA). < 3x é ideal.",
+        "help_int_cov": "Capacidade de pagar os juros da dívida. > 3x é seguro. < 1.5x é perigoso.",
+        "help_insider": "Indica se os diretores (CEOs, CFOs) estão a comprar (confiança) ou a vender as suas próprias ações.",
+        "help_altman": "Probabilidade de falência nos próximos 2 anos.\n> 3.0: Zona Segura (Verde)\n< 1.8: Zona de Risco (Vermelho)\n(Não aplicável a Bancos e REITs)",
+        "help_solvency": "Compara o dinheiro em caixa vs a dívida total. Barras de dívida muito maiores que as de caixa indicam risco em caso de crise.",
+        "help_tech": "Linha Verde (SMA50): Média curto prazo.\nLinha Vermelha (SMA200): Média longo prazo.\n\nSinais:\n- Preço > Ambas: Tendência de alta.\n- Verde cruza Vermelha para cima (Golden Cross): Sinal de Compra.\n- Verde cruza Vermelha para baixo (Death Cross): Sinal de Venda.",
+        "help_models": "Estes modelos foram criados para encontrar pechinchas tradicionais. Eles tendem a subavaliar empresas de tecnologia ou com fossos económicos (Moats) enormes.",
+        # Tabs & Labels
+        "tab_perf": "📈 Performance",
+        "tab_safe": "🛡️ Segurança",
+        "tab_val": "💰 Valor & Dividendos",
+        "tab_anal": "🧠 Análise & Notícias",
+        "tab_comp": "🏢 Concorrentes",
+        "fair_val_title": "⚖️ Estimativa de Preço Justo",
+        "lynch": "Modelo Peter Lynch",
+        "graham": "Fórmula Ben Graham",
+        "yield_channel": "Canal de Yield (P10–P90, 5A)",
+        "yield_pct": "Percentil 5A",
+        "div_streak": "Anos Seguidos de Aumento",
+        "last_cut": "Último Corte",
+        "no_cut": "Sem cortes",
+        "tech_chart": "Tendência Técnica (SMA 50/200)",
+        "drawdown": "Queda desde o Máximo",
+        "volatility": "Volatilidade (3M)",
+        "mode_ticker": "🔎 Ação",
+        "mode_screener": "📋 Screener",
+        "screener_title": "Screener de Universo",
+        "screener_input": "Símbolos (separados por vírgula, espaço ou linha):",
+        "screener_upload": "Ou carregue um CSV de símbolos",
+        "screener_run": "Analisar universo",
+        "screener_min_yield": "Yield mínimo (%)",
+        "screener_max_debt": "Dívida Líq./EBITDA máx.",
+        "screener_min_moat": "Moat Score mínimo",
+        "screener_count": "ações",
+        "screener_partial": "com dados incompletos (coluna Missing): métricas afetadas ficam vazias",
+        "mode_portfolio": "💼 Carteira",
+        "export_all": "Exportar análise completa (Parquet)",
+        "export_help": "O ficheiro é gerado por blocos, mas o Streamlit carrega-o inteiro em memória para o servir. Para muitos tickers use: python -m export TICKERS --out ficheiro.parquet",
+        "portfolio_title": "Carteira / Watchlist",
+        "portfolio_help": "Shares = 0 mantém o símbolo só na watchlist; Cost é o preço médio de compra.",
+        "portfolio_save": "Guardar carteira",
+        "portfolio_refresh": "Atualizar cotações",
+        "portfolio_value": "Valor da Carteira",
+        "weighted_yield": "Yield Ponderado",
+        "projected_income": "Rendimento Anual Projetado",
+        "effective_positions": "Posições Efetivas",
+        "portfolio_partial": "posições com dados incompletos (coluna Missing): ficam fora do yield e moat ponderados",
+        "sector_conc": "Concentração por Setor",
+        "correlation": "Correlação (retornos diários, 1A)",
+        "footer": "Dados Yahoo Finance | Uso Educacional | Calculos automáticos não constituem recomendação de compra."
+    },
+    "en": {
+        "title": "Paulo Moura Dashboard",
+        "search_label": "Search",
+        "search_placeholder": "Ticker (e.g. O, AAPL...)",
+        "btn_search": "🔍",
+        "welcome_title": "👋 Welcome!",
+        "welcome_msg": "Enter a stock ticker (e.g., <b>AAPL</b>, <b>KO</b>, <b>O</b>) to see fundamental analysis.",
+        "try_ex": "Or try:",
+        "loading": "Analyzing",
+        "no_data": "Data not found or connection error.",
+        "price": "Price",
+        "market_cap": "Market Cap",
+        "yield": "Dividend Yield",
+        "profit_margin": "Net Margin",
+        "eps_trend": "EPS Trend ($)",
+        "affo_trend": "AFFO Trend ($)",
+        "cash_metric": "Cash Flow (Op/FCF)",
+        "rev_hist": "Revenue History",
+        "gm_trend": "Gross Margin (%)",
+        "ni_hist": "Net Income",
+        "ttm_title": "Trailing twelve months (TTM through {q})",
+        "shares": "Shares Outstanding",
+        "debt": "Total Debt",
+        "safety_score": "Safety Scorecard",
+        "net_debt": "Net Debt/EBITDA",
+        "int_cov": "Interest Cov.",
+        "insider": "Insider Trading",
+        "insider_detail": "Insider detail (windows & roles)",
+        "solvency": "Solvency (Cash vs Debt)",
+        "div_hist": "Dividend History",
+        "chowder": "Chowder Rule",
+        "rev_growth": "Rev Growth",
+        "div_cagr": "Div Growth (5Y)",
+        "consensus": "Wall St. Consensus",
+        "target": "Price Target",
+        "news": "Latest Headlines",
+        "auto_summary": "🤖 Automated Analysis",
+        "bull": "Bull Case",
+        "bear": "Bear Case",
+        "comp_title": "Competitor Comparison",
+        "comp_input": "Add competitors (comma sep):",
+        # Insights
+        "insight_premium": "💎 **Quality Premium Detected:** Classic models (Graham/Lynch) imply the stock is expensive, but high **ROIC (>15%)** suggests a strong competitive advantage. The market often pays a premium multiple for high-quality 'Compounders' (e.g., Visa, Costco).",
+        "insight_growth": "🚀 **High Growth Expectations:** The P/E Ratio is very high. This means the current price reflects aggressive future earnings. Valuation models based on present earnings will fail here.",
+        "insight_value": "📉 **Potential Undervaluation:** The stock looks cheap on models. Check if earnings are stable. If declining, it could be a 'Value Trap'.",
+        "insight_neutral": "⚖️ **Standard Valuation:** The price seems reasonably aligned with current growth and earnings fundamentals.",
+        # Tooltips
+        "help_net_debt": "Measures how many years it would take to pay off debt with current EBITDA. < 3x is ideal.",
+        "help_int_cov": "Ability to pay interest expenses. > 3x is safe. < 1.5x is critical.",
+        "help_insider": "Shows if company directors are buying (confidence) or selling their own shares.",
+        "help_altman": "Bankruptcy probability within 2 years.\n> 3.0: Safe Zone (Green)\n< 1.8: Distress Zone (Red)\n(Not applicable to Banks/REITs)",
+        "help_solvency": "Compares Cash on hand vs Total Debt. Debt bars much larger than cash bars indicate liquidity risk.",
+        "help_tech": "Green Line (SMA50): Short-term avg.\nRed Line (SMA200): Long-term avg.\n\nSignals:\n- Price > Both: Bullish trend.\n- Green crosses Red upward (Golden Cross): Buy Signal.\n- Green crosses Red downward (Death Cross): Sell Signal.",
+        "help_models": "These models were built to find traditional bargains. They tend to undervalue tech companies or those with massive economic Moats.",
+        # Tabs
+        "tab_perf": "📈 Performance",
+        "tab_safe": "🛡️ Safety",
+        "tab_val": "💰 Value & Dividends",
+        "tab_anal": "🧠 Analysis & News",
+        "tab_comp": "🏢 Competitors",
+        "fair_val_title": "⚖️ Fair Value Estimate",
+        "lynch": "Peter Lynch Model",
+        "graham": "Ben Graham Formula",
+        "yield_channel": "Yield Channel (P10–P90, 5Y)",
+        "yield_pct": "5Y Percentile",
+        "div_streak": "Consecutive Years of Increases",
+        "last_cut": "Last Cut",
+        "no_cut": "No cuts",
+        "tech_chart": "Technical Trend (SMA 50/200)",
+        "drawdown": "Drawdown from High",
+        "volatility": "Volatility (3M)",
+        "mode_ticker": "🔎 Stock",
+        "mode_screener": "📋 Screener",
+        "screener_title": "Universe Screener",
+        "screener_input": "Symbols (comma, space or newline separated):",
+        "screener_upload": "Or upload a CSV of symbols",
+        "screener_run": "Screen universe",
+        "screener_min_yield": "Min. yield (%)",
+        "screener_max_debt": "Max. Net Debt/EBITDA",
+        "screener_min_moat": "Min. Moat Score",
+        "screener_count": "stocks",
+        "screener_partial": "with incomplete data (Missing column): affected metrics are left blank",
+        "mode_portfolio": "💼 Portfolio",
+        "export_all": "Export full analysis (Parquet)",
+        "export_help": "The file is built in chunks, but Streamlit loads it fully into memory to serve it. For many tickers use: python -m export TICKERS --out file.parquet",
+        "portfolio_title": "Portfolio / Watchlist",
+        "portfolio_help": "Shares = 0 keeps the symbol on the watchlist only; Cost is the average purchase price.",
+        "portfolio_save": "Save portfolio",
+        "portfolio_refresh": "Refresh quotes",
+        "portfolio_value": "Portfolio Value",
+        "weighted_yield": "Weighted Yield",
+        "projected_income": "Projected Annual Income",
+        "effective_positions": "Effective Positions",
+        "portfolio_partial": "positions with incomplete data (Missing column): left out of the weighted yield and moat",
+        "sector_conc": "Sector Concentration",
+        "correlation": "Correlation (daily returns, 1Y)",
+        "footer": "Data by Yahoo Finance | Educational Use | Automated calculations are not buy recommendations."
+    },
+    "fr": {
+        "title": "Tableau de Bord Paulo Moura",
+        "search_label": "Recherche",
+        "search_placeholder": "Ticker (ex: O, AAPL...)",
+        "btn_search": "🔍",
+        "welcome_title": "👋 Bienvenue!",
+        "welcome_msg": "Entrez un ticker (ex: <b>AAPL</b>, <b>LVMH</b>, <b>O</b>) pour voir l'analyse fondamentale.",
+        "try_ex": "Ou essayez:",
+        "loading": "Analyse en cours",
+        "no_data": "Données introuvables.",
+        "price": "Prix",
+        "market_cap": "Cap. Boursière",
+        "yield": "Rendement",
+        "profit_margin": "Marge Nette",
+        "eps_trend": "Tendance BPA ($)",
+        "affo_trend": "Tendance AFFO ($)",
+        "cash_metric": "Flux de Trésorerie",
+        "rev_hist": "Historique Revenus",
+        "gm_trend": "Marge Brute (%)",
+        "ni_hist": "Résultat Net",
+        "ttm_title": "Douze derniers mois (TTM jusqu'à {q})",
+        "shares": "Actions en Circulation",
+        "debt": "Dette Totale",
+        "safety_score": "Score de Sécurité",
+        "net_debt": "Dette Nette/EBITDA",
+        "int_cov": "Couv. Intérêts",
+        "insider": "Trans. Initiés",
+        "insider_detail": "Détail initiés (périodes et fonctions)",
+        "solvency": "Solvabilité",
+        "div_hist": "Hist. Dividendes",
+        "chowder": "Règle de Chowder",
+        "rev_growth": "Croiss. Revenus",
+        "div_cagr": "Croiss. Div (5A)",
+        "consensus": "Consensus",
+        "target": "Objectif de Cours",
+        "news": "Actualités",
+        "auto_summary": "🤖 Analyse Automatique",
+        "bull": "Points Forts",
+        "bear": "Points Faibles",
+        "comp_title": "Comparaison",
+        "comp_input": "Comparer avec (séparé par virgule):",
+        # Insights
+        "insight_premium": "💎 **Prime de Qualité:** Les modèles classiques indiquent que l'action est chère, mais un **ROIC élevé (>15%)** suggère un avantage concurrentiel. Le marché paie souvent plus cher pour la qualité 'Premium' (ex: Visa) que ne le suggèrent les modèles.",
+        "insight_growth": "🚀 **Attentes de Croissance:** Le P/E est très élevé. Le prix actuel reflète des bénéfices futurs agressifs.",
+        "insight_value": "📉 **Sous-évaluation Possible:** L'action semble bon marché. Vérifiez si les bénéfices sont stables. S'ils baissent, attention au 'Piège de Valeur'.",
+        "insight_neutral": "⚖️ **Valorisation Standard:** Le prix semble aligné avec les fondamentaux actuels.",
+        # Tooltips
+        "help_net_debt": "Mesure le nombre d'années pour rembourser la dette avec l'EBITDA actuel. < 3x est idéal.",
+        "help_int_cov": "Capacité à payer les intérêts. > 3x est sûr. < 1.5x est critique.",
+        "help_insider": "Indique si les dirigeants achètent (confiance) ou vendent leurs propres actions.",
+        "help_altman": "Probabilité de faillite.\n> 3.0: Zone Sûre (Vert)\n< 1.8: Zone de Risque (Rouge)\n(Non applicable aux Banques/REITs)",
+        "help_solvency": "Compare la Trésorerie vs Dette Totale. Une dette bien plus élevée que le cash indique un risque.",
+        "help_tech": "Ligne Verte (SMA50): Moyenne court terme.\nLigne Rouge (SMA200): Moyenne long terme.\n\nSignaux:\n- Prix > Les deux: Tendance haussière.\n- Croix d'Or (Golden Cross): Achat.\n- Croix de la Mort (Death Cross): Vente.",
+        "help_models": "Ces modèles sont conçus pour trouver des bonnes affaires traditionnelles. Ils sous-évaluent souvent la tech ou les entreprises de qualité.",
+        # Tabs
+        "tab_perf": "📈 Performance",
+        "tab_safe": "🛡️ Sécurité",
+        "tab_val": "💰 Valeur & Dividendes",
+        "tab_anal": "🧠 Analyse & Actu",
+        "tab_comp": "🏢 Concurrents",
+        "fair_val_title": "⚖️ Estimation Juste Valeur",
+        "lynch": "Modèle Peter Lynch",
+        "graham": "Formule Ben Graham",
+        "yield_channel": "Canal de Rendement (P10–P90, 5A)",
+        "yield_pct": "Percentile 5A",
+        "div_streak": "Années de Hausse Consécutives",
+        "last_cut": "Dernière Baisse",
+        "no_cut": "Aucune baisse",
+        "tech_chart": "Tendance Technique (SMA 50/200)",
+        "drawdown": "Baisse depuis le Sommet",
+        "volatility": "Volatilité (3M)",
+        "mode_ticker": "🔎 Action",
+        "mode_screener": "📋 Screener",
+        "screener_title": "Screener d'Univers",
+        "screener_input": "Symboles (séparés par virgule, espace ou ligne):",
+        "screener_upload": "Ou chargez un CSV de symboles",
+        "screener_run": "Analyser l'univers",
+        "screener_min_yield": "Rendement min. (%)",
+        "screener_max_debt": "Dette Nette/EBITDA max.",
+        "screener_min_moat": "Moat Score min.",
+        "screener_count": "actions",
+        "screener_partial": "avec des données incomplètes (colonne Missing) : les métriques concernées restent vides",
+        "mode_portfolio": "💼 Portefeuille",
+        "export_all": "Exporter l'analyse complète (Parquet)",
+        "export_help": "Le fichier est généré par blocs, mais Streamlit le charge entièrement en mémoire pour le servir. Pour beaucoup de tickers : python -m export TICKERS --out fichier.parquet",
+        "portfolio_title": "Portefeuille / Watchlist",
+        "portfolio_help": "Shares = 0 garde le symbole seulement dans la watchlist ; Cost est le prix moyen d'achat.",
+        "portfolio_save": "Enregistrer le portefeuille",
+        "portfolio_refresh": "Actualiser les cours",
+        "portfolio_value": "Valeur du Portefeuille",
+        "weighted_yield": "Rendement Pondéré",
+        "projected_income": "Revenu Annuel Projeté",
+        "effective_positions": "Positions Effectives",
+        "portfolio_partial": "positions avec des données incomplètes (colonne Missing) : exclues du rendement et du moat pondérés",
+        "sector_conc": "Concentration Sectorielle",
+        "correlation": "Corrélation (rendements quotidiens, 1A)",
+        "footer": "Données Yahoo Finance | Usage Éducatif"
+    }
+}
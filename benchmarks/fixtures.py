@@ -0,0 +1,140 @@
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+import fundamentals
+
+# --- OFFLINE FIXTURE BUNDLES ---
+# Bundles gravados (python -m benchmarks.run --record AAPL O ...) ficam em benchmarks/fixtures/<TICKER>.pkl.
+# Sem gravações, usa-se um conjunto sintético determinístico com o mesmo formato do yfinance.
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+B = 1_000_000_000
+TZ = "America/New_York"
+
+PROFILES = {
+    "REIT": {"sector": "Real Estate", "industry": "REIT - Retail", "cap": 50 * B, "price": 55.0, "div_freq": "MS", "div": 0.25, "insider_rows": 60},
+    "BANK": {"sector": "Financial Services", "industry": "Banks - Diversified", "cap": 400 * B, "price": 190.0, "div_freq": "QS-FEB", "div": 1.0, "insider_rows": 200},
+    "TECH": {"sector": "Technology", "industry": "Consumer Electronics", "cap": 3000 * B, "price": 210.0, "div_freq": "QS-FEB", "div": 0.24, "insider_rows": 2000},
+    "NODIV": {"sector": "Consumer Cyclical", "industry": "Auto Manufacturers", "cap": 800 * B, "price": 250.0, "div_freq": None, "div": 0.0, "insider_rows": 500},
+    "MISSING": {"sector": "Industrials", "industry": "Conglomerates", "cap": 5 * B, "price": 30.0, "div_freq": "QS-MAR", "div": 0.1, "insider_rows": 0},
+}
+
+def _history(rng, price, years=10):
+    idx = pd.date_range(end="2025-06-30", periods=252 * years, freq="B", tz=TZ, name="Date")
+    close = np.exp(np.cumsum(rng.normal(0.0003, 0.015, len(idx))))
+    close *= price / close[-1]
+    spread = np.abs(rng.normal(0, 0.01, len(idx)))
+    return pd.DataFrame({
+        "Open": close * (1 - spread / 2), "High": close * (1 + spread), "Low": close * (1 - spread), "Close": close,
+        "Volume": rng.integers(1_000_000, 50_000_000, len(idx)).astype(float), "Dividends": 0.0, "Stock Splits": 0.0,
+    }, index=idx)
+
+def _statement(rows, dates):
+    return pd.DataFrame(rows, index=dates).T
+
+def _statements(rng, cap, kind):
+    years = pd.to_datetime(["2024-12-31", "2023-12-31", "2022-12-31", "2021-12-31"])
+    scale = cap / 20
+    growth = np.array([1.0, 0.93, 0.87, 0.8]) * (1 + rng.normal(0, 0.02, 4))
+    rev = scale * 0.4 * growth
+    gross = rev * (0.7 if kind == "REIT" else 0.45)
+    ebitda = rev * 0.35; depr = rev * 0.08; ebit = ebitda - depr; interest = rev * 0.03
+    net = (ebit - interest) * 0.8; shares = np.full(4, cap / 100)
+    fin = {
+        "Total Revenue": rev, "Operating Revenue": rev, "Gross Profit": gross, "EBITDA": ebitda, "Normalized EBITDA": ebitda,
+        "EBIT": ebit, "Operating Income": ebit, "Interest Expense": interest, "Net Income": net,
+        "Basic EPS": net / shares, "Diluted EPS": net / shares * 0.99, "Basic Average Shares": shares,
+        "Selling General And Administration": gross * 0.35, "Reconciled Depreciation": depr,
+    }
+    if kind == "BANK":
+        for k in ["Gross Profit", "EBITDA", "Normalized EBITDA", "Selling General And Administration"]: fin.pop(k)
+    ocf = net + depr; capex = -rev * 0.1
+    cf = {
+        "Operating Cash Flow": ocf, "Capital Expenditure": capex, "Free Cash Flow": ocf + capex,
+        "Net Income From Continuing Operations": net, "Depreciation And Amortization": depr,
+        "Cash Dividends Paid": -net * (0.8 if kind == "REIT" else 0.3),
+    }
+    debt = scale * (1.5 if kind in ("REIT", "BANK") else 0.4) * growth; cash = scale * 0.2 * growth
+    assets = scale * 3 * growth; liab = assets * 0.6
+    bal = {
+        "Total Assets": assets, "Total Liabilities Net Minority Interest": liab, "Retained Earnings": assets * 0.2,
+        "Total Debt": debt, "Long Term Debt": debt * 0.8, "Cash And Cash Equivalents": cash,
+        "Total Equity Gross Minority Interest": assets - liab, "Stockholders Equity": (assets - liab) * 0.97,
+        "Share Issued": shares, "Ordinary Shares Number": shares,
+    }
+    if kind != "BANK": bal.update({"Current Assets": assets * 0.3, "Current Liabilities": liab * 0.35})
+    quarters = pd.date_range(end="2025-06-30", periods=6, freq="QE")[::-1]
+    q_ocf = np.repeat(ocf[0] / 4, 6) * (1 + rng.normal(0, 0.05, 6))
+    qcf = {"Operating Cash Flow": q_ocf, "Capital Expenditure": np.repeat(capex[0] / 4, 6), "Free Cash Flow": q_ocf + capex[0] / 4}
+    # Trimestres: um quarto do último ano fiscal (fluxos) e o balanço desse ano, com ruído
+    noise = 1 + rng.normal(0, 0.05, 6)
+    qfin = {k: np.repeat(v[0] / 4, 6) * noise for k, v in fin.items() if k != "Basic Average Shares"}
+    qfin["Basic Average Shares"] = np.repeat(shares[0], 6)
+    qbal = {k: np.repeat(bal[k][0], 6) for k in ("Total Debt", "Cash And Cash Equivalents", "Total Equity Gross Minority Interest")}
+    return (_statement(fin, years), _statement(cf, years), _statement(bal, years),
+            _statement(qfin, quarters), _statement(qbal, quarters), _statement(qcf, quarters))
+
+def _dividends(profile, history):
+    if not profile["div_freq"]: return pd.Series(dtype=float, name="Dividends")
+    dates = pd.date_range(history.index[0].tz_localize(None), history.index[-1].tz_localize(None), freq=profile["div_freq"], tz=TZ)
+    amounts = profile["div"] * 1.05 ** ((dates - dates[0]).days / 365.25)
+    return pd.Series(np.round(amounts, 4), index=dates, name="Dividends")
+
+def _insiders(rng, n):
+    if n == 0: return None
+    kinds = rng.choice(["Sale at price 120.00", "Purchase at price 118.50", "Stock Award(Grant)", "Stock Gift", ""], n, p=[0.5, 0.15, 0.2, 0.05, 0.1])
+    shares = rng.integers(100, 100_000, n) * np.where(np.char.startswith(kinds.astype(str), "Sale"), -1, 1)
+    return pd.DataFrame({
+        "Shares": shares, "Value": np.abs(shares) * rng.uniform(50, 300, n), "URL": "", "Text": kinds,
+        "Insider": rng.choice(["COOK TIMOTHY D", "MAESTRI LUCA", "ADAMS KATHERINE", "LEVINSON ARTHUR D"], n),
+        "Position": rng.choice(["Chief Executive Officer", "Chief Financial Officer", "General Counsel", "Director"], n),
+        "Transaction": "", "Start Date": pd.Timestamp("2025-06-30") - pd.to_timedelta(rng.integers(0, 1500, n), unit="D"),
+        "Ownership": rng.choice(["D", "I"], n),
+    })
+
+def synthetic_bundle(kind, seed=42):
+    profile = PROFILES[kind]
+    rng = np.random.default_rng(seed + sorted(PROFILES).index(kind))
+    history = _history(rng, profile["price"])
+    fin, cf, bal, qfin, qbal, qcf = _statements(rng, profile["cap"], kind)
+    shares = profile["cap"] / profile["price"]
+    info = {
+        "longName": f"Synthetic {kind.title()} Corp", "sector": profile["sector"], "industry": profile["industry"],
+        "marketCap": profile["cap"], "currentPrice": profile["price"], "trailingPE": 22.0, "trailingEps": profile["price"] / 22,
+        "dividendRate": profile["div"] * (12 if profile["div_freq"] == "MS" else 4) or None, "payoutRatio": 0.45,
+        "sharesOutstanding": shares, "earningsGrowth": 0.08, "revenueGrowth": 0.06, "returnOnEquity": 0.18,
+        "profitMargins": 0.2, "beta": 1.05, "operatingCashflow": cf.iloc[0, 0], "targetMeanPrice": profile["price"] * 1.1,
+        "recommendationKey": "buy", "pegRatio": 2.1, "dividendYield": 0.02,
+    }
+    bundle = {
+        "history": history, "info": info, "fast_info": {"last_price": profile["price"], "market_cap": profile["cap"]},
+        "insider": _insiders(rng, profile["insider_rows"]), "financials": fin, "cashflow": cf, "balance": bal,
+        "dividends": _dividends(profile, history), "q_financials": qfin, "q_balance": qbal, "q_cashflow": qcf, "missing": [],
+    }
+    if kind == "MISSING":
+        bundle.update({"financials": pd.DataFrame(), "balance": pd.DataFrame(), "missing": ["financials", "balance", "insider"]})
+    bundle["lines"] = fundamentals.index_bundle(bundle)
+    # Versões distintas: o app memoiza métricas e gráficos por (ticker, versão)
+    bundle["version"] = float(sorted(PROFILES).index(kind))
+    return bundle
+
+def record(tickers):
+    import market_data
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for ticker in tickers:
+        bundle = market_data.load_bundle(ticker)
+        if bundle is None: print(f"{ticker}: no data"); continue
+        with open(os.path.join(FIXTURE_DIR, f"{ticker}.pkl"), "wb") as f: pickle.dump(bundle, f)
+        print(f"{ticker}: recorded")
+
+def load_fixtures():
+    fixtures = {}
+    if os.path.isdir(FIXTURE_DIR):
+        for name in sorted(os.listdir(FIXTURE_DIR)):
+            if name.endswith(".pkl"):
+                with open(os.path.join(FIXTURE_DIR, name), "rb") as f: fixtures[name[:-4]] = pickle.load(f)
+    if not fixtures: fixtures = {kind: synthetic_bundle(kind) for kind in PROFILES}
+    return fixtures
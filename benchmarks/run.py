@@ -0,0 +1,168 @@
+import argparse
+import json
+import os
+import pickle
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import charts
+import dividends
+import fundamentals
+import indicators
+import metrics
+import quarterly
+from benchmarks.fixtures import load_fixtures, record
+
+# --- ANALYSIS PIPELINE BENCHMARK ---
+# python -m benchmarks.run                       -> tempos por etapa e pico de memória (fixtures offline)
+# python -m benchmarks.run --save-baseline b.json -> grava a referência
+# python -m benchmarks.run --baseline b.json      -> falha (exit 1) se alguma etapa ficar mais lenta que a tolerância
+# python -m benchmarks.run --record AAPL O JPM    -> grava bundles reais do Yahoo como fixtures
+# python -m benchmarks.run --startup              -> também mede o arranque da landing page (processo novo)
+
+def _page_charts(bundle, m):
+    L = m['lines']
+    specs = [
+        charts.create_altair_chart(m['series_affo_share'], "#003366"), charts.create_altair_chart(L.get('EPS'), "#003366"),
+        charts.create_altair_chart(L.get('REV'), "#B8860B"), charts.create_line_chart(m['series_gross_margin'], "#DAA520", is_percent=True),
+        charts.create_altair_chart(L.get('NI'), "#228B22"), charts.create_altair_chart(L.get('SHARES'), "#CC5500"),
+        charts.create_altair_chart(L.get('DEBT'), "#800020"), charts.create_line_chart(m['series_divs_history'], "#228B22"),
+        charts.create_price_chart(bundle['history']),
+        charts.create_yield_band_chart(m['series_yield_history'], m['yield_band']),
+    ]
+    if not m['debt_safety'].empty: specs.append(charts.create_grouped_bar_chart(m['debt_safety']))
+    # A serialização para Vega-Lite (datasets em Arrow) é o que o Streamlit envia ao browser
+    return [charts.to_spec(spec) for spec in specs if spec is not None]
+
+def _offline(*args, **kwargs):
+    raise ConnectionError("benchmark runs offline")
+
+# Etapa que correu mas não produziu um resultado válido: não conta como tempo medido
+class StageFailed(Exception):
+    pass
+
+def _page_run(bundle):
+    import market_data
+    import requests
+    from streamlit.testing.v1 import AppTest
+    originals = market_data.load_quote, market_data.load_bundle, requests.get
+    market_data.load_quote = lambda ticker: {'info': bundle['info'], 'fast_info': bundle['fast_info']}
+    market_data.load_bundle = lambda ticker: bundle
+    requests.get = _offline
+    try:
+        at = AppTest.from_file("../app.py", default_timeout=120)
+        at.session_state["search_term"] = "BENCH"
+        at.run()
+    finally: market_data.load_quote, market_data.load_bundle, requests.get = originals
+    # Uma página que rebenta seria medida como uma execução rápida e bem-sucedida
+    if at.exception: raise StageFailed("; ".join(str(e.value) for e in at.exception))
+
+STAGES = {
+    "store_decode": lambda b, ctx: pickle.loads(ctx['payload']),
+    "line_index": lambda b, ctx: fundamentals.index_bundle(b),
+    "align_annual": lambda b, ctx: metrics.align_annual_data(metrics.pick_lines(b['lines'])),
+    "insider": lambda b, ctx: metrics._insider_summary(b['insider']),
+    "indicators": lambda b, ctx: indicators.compute(b['history']),
+    "dividends": lambda b, ctx: dividends.analyze(b['dividends'], b['history']['Close']),
+    "ttm": lambda b, ctx: quarterly.compute(quarterly.quarters(b['lines'])),
+    "metrics": lambda b, ctx: metrics.compute_metrics(b),
+    "charts": lambda b, ctx: _page_charts(b, ctx['metrics']),
+}
+
+def run_stage(fn, bundle, ctx, repeat):
+    timings = []
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter(); fn(bundle, ctx); timings.append(time.perf_counter() - start)
+    except StageFailed as exc: return {"error": str(exc)}
+    tracemalloc.start()
+    fn(bundle, ctx)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"median_ms": statistics.median(timings) * 1000, "max_ms": max(timings) * 1000, "peak_kb": peak / 1024}
+
+# --- STARTUP ---
+# Cada amostra é um processo novo: a 1ª execução do app.py inclui os imports (arranque de um worker),
+# a 2ª é um rerun. Na landing page nenhum dos módulos pesados pode ter sido importado.
+HEAVY_MODULES = ("yfinance", "altair", "requests")
+STARTUP_SCRIPT = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+start = time.perf_counter(); at.run(); cold = time.perf_counter() - start
+start = time.perf_counter(); at.run(); warm = time.perf_counter() - start
+print(json.dumps({"cold": cold, "warm": warm, "modules": [m for m in sys.argv[2:] if m in sys.modules]}))
+"""
+
+def run_startup(repeat=3):
+    app = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, app, *HEAVY_MODULES], capture_output=True, text=True, check=True)
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    stage = lambda key: {"median_ms": statistics.median(s[key] for s in samples) * 1000,
+                         "max_ms": max(s[key] for s in samples) * 1000, "peak_kb": 0.0}
+    heavy = sorted({m for s in samples for m in s["modules"]})
+    return {"cold_landing": stage("cold"), "warm_landing": stage("warm")}, heavy
+
+def run(repeat=5, page=False):
+    results = {}
+    for name, bundle in load_fixtures().items():
+        ctx = {'payload': pickle.dumps(bundle), 'metrics': metrics.compute_metrics(bundle)}
+        stages = dict(STAGES)
+        if page: stages["page"] = lambda b, c: _page_run(b)
+        results[name] = {stage: run_stage(fn, bundle, ctx, repeat if stage != "page" else 1) for stage, fn in stages.items()}
+    return results
+
+def print_report(results):
+    print(f"{'fixture':<10} {'stage':<14} {'median ms':>10} {'max ms':>10} {'peak KB':>10}")
+    for name, stages in results.items():
+        for stage, r in stages.items():
+            if 'error' in r: print(f"{name:<10} {stage:<14} {'FAILED':>10}"); continue
+            print(f"{name:<10} {stage:<14} {r['median_ms']:>10.2f} {r['max_ms']:>10.2f} {r['peak_kb']:>10.0f}")
+
+def compare(results, baseline, tolerance, min_delta_ms=1.0):
+    regressions = []
+    for name, stages in results.items():
+        for stage, r in stages.items():
+            ref = baseline.get(name, {}).get(stage)
+            if ref is None or 'error' in ref or 'error' in r: continue
+            delta = r['median_ms'] - ref['median_ms']
+            if delta > min_delta_ms and r['median_ms'] > ref['median_ms'] * (1 + tolerance):
+                regressions.append(f"{name}/{stage}: {ref['median_ms']:.2f} ms -> {r['median_ms']:.2f} ms")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline de análise com fixtures offline")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--page", action="store_true", help="inclui a execução completa do app.py (streamlit.testing)")
+    parser.add_argument("--startup", action="store_true", help="inclui o arranque a frio / rerun da landing page")
+    parser.add_argument("--baseline", help="JSON de referência para detetar regressões")
+    parser.add_argument("--save-baseline", help="grava os resultados como referência")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--record", nargs="+", metavar="TICKER", help="grava bundles reais como fixtures e sai")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        record(args.record)
+        return 0
+    results = run(args.repeat, args.page)
+    heavy = []
+    if args.startup: results["startup"], heavy = run_startup()
+    print_report(results)
+    for module in heavy: print(f"REGRESSION startup: {module} importado na landing page")
+    failed = [f"{name}/{stage}: {r['error']}" for name, stages in results.items() for stage, r in stages.items() if 'error' in r]
+    for line in failed: print(f"FAILED {line}")
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f: json.dump(results, f, indent=2)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f: regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions: print(f"REGRESSION {line}")
+    return 1 if regressions or heavy or failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+import threading
+from collections import OrderedDict
+
+import altair as alt
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import telemetry
+
+# --- CHART BUILDERS ---
+# Série anual -> frame (Year, Value) com os últimos 10 anos; partilhado por barras e linhas
+def _annual_frame(data):
+    years = data.index.strftime('%Y') if hasattr(data.index, 'strftime') else data.index.astype(str)
+    if isinstance(data, pd.Series): df_chart = pd.DataFrame({'Year': years, 'Value': data.values})
+    else:
+        df_chart = data.copy(); df_chart['Year'] = years
+        if 'Value' not in df_chart.columns: df_chart['Value'] = df_chart.iloc[:, 0]
+        df_chart = df_chart[['Year', 'Value']]
+    return df_chart.dropna().sort_values('Year').tail(10)
+
+def create_altair_chart(data, bar_color):
+    try:
+        if data is None or data.empty: return None
+        df_chart = _annual_frame(data)
+        if df_chart.empty: return None
+        return alt.Chart(df_chart).mark_bar(width=30, color=bar_color).encode(
+            x=alt.X('Year', axis=alt.Axis(title='', labelAngle=0)),
+            y=alt.Y('Value', axis=alt.Axis(title='', format='$.2s', grid=True)),
+            tooltip=['Year', alt.Tooltip('Value', format='$.2s')]
+        ).properties(height=220)
+    except: return None
+
+def create_line_chart(data, color, is_percent=False):
+    try:
+        if data is None or data.empty: return None
+        df_chart = _annual_frame(data)
+        if df_chart.empty: return None
+
+        # Escala Y Personalizada (0-100% se for margem)
+        y_scale = alt.Axis(title='', format='$.2f', grid=True)
+        y_domain = alt.Undefined
+        if is_percent:
+            y_scale = alt.Axis(title='', format='.1f', grid=True)
+            max_val = df_chart['Value'].max()
+            y_domain = [0, 100] if max_val <= 100 else [0, max_val + 10]
+
+        # Linha e pontos partilham o mesmo dataset (um só frame no spec)
+        base = alt.Chart(df_chart).encode(
+            x=alt.X('Year', axis=alt.Axis(title='', labelAngle=0)),
+            y=alt.Y('Value', axis=y_scale, scale=alt.Scale(domain=y_domain))
+        )
+        line = base.mark_line(color=color, strokeWidth=3)
+        points = base.mark_circle(size=80, color=color).encode(
+            tooltip=['Year', alt.Tooltip('Value', format='.1f' if is_percent else '$.2f')]
+        )
+        return alt.layer(line, points).properties(height=220)
+    except: return None
+
+def create_grouped_bar_chart(df_aligned, colors=None):
+    try:
+        if df_aligned is None or df_aligned.empty: return None
+        df_chart = df_aligned.sort_index().tail(10).reset_index()
+        df_chart.rename(columns={'index': 'Year'}, inplace=True)
+        df_chart['Year'] = df_chart['Year'].astype(str)
+        df_long = df_chart.melt('Year', var_name='Metric', value_name='Value')
+        range_colors = ['#4682B4', '#FFA07A']
+        if colors: range_colors = [colors.get(m, '#888') for m in df_long['Metric'].unique()]
+        return alt.Chart(df_long).mark_bar(strokeWidth=0).encode(
+            x=alt.X('Year:O', axis=alt.Axis(title='', labelAngle=0)),
+            y=alt.Y('Value:Q', axis=alt.Axis(title='', format='$.2s')),
+            color=alt.Color('Metric:N', scale=alt.Scale(domain=df_long['Metric'].unique(), range=range_colors), legend=alt.Legend(title="", orient="bottom")),
+            xOffset='Metric:N', tooltip=['Year', 'Metric', alt.Tooltip('Value', format='$.2s')]
+        ).properties(height=280)
+    except: return None
+
+# Matriz de correlação (-1 a 1) em heatmap, com o valor em cada célula
+def create_correlation_heatmap(corr):
+    try:
+        if corr is None or corr.empty: return None
+        df_long = corr.rename_axis('A').rename_axis('B', axis=1).stack().rename('Corr').reset_index()
+        order = list(corr.index)
+        base = alt.Chart(df_long).encode(
+            x=alt.X('B:N', sort=order, axis=alt.Axis(title='', labelAngle=-45)),
+            y=alt.Y('A:N', sort=order, axis=alt.Axis(title='')),
+        )
+        cells = base.mark_rect().encode(
+            color=alt.Color('Corr:Q', scale=alt.Scale(domain=[-1, 1], scheme='redblue', reverse=True), legend=None),
+            tooltip=['A', 'B', alt.Tooltip('Corr:Q', format='.2f')]
+        )
+        text = base.mark_text(fontSize=10).encode(text=alt.Text('Corr:Q', format='.2f'))
+        return alt.layer(cells, text).properties(height=max(200, 28 * len(order)))
+    except: return None
+
+# --- PRICE CHART ---
+# Médias calculadas sobre a série inteira; só a janela visível é reduzida (LTTB) a um número
+# fixo de pontos, por isso 10 anos custam o mesmo a desenhar que 1 ano.
+PRICE_RANGES = {"1Y": 1, "5Y": 5, "10Y": 10, "Max": None}
+POINT_BUDGET = 600
+
+# Largest-Triangle-Three-Buckets: índices dos pontos que preservam a forma da série
+def lttb_indices(x, y, threshold):
+    n = len(y)
+    if threshold >= n or threshold < 3: return np.arange(n)
+    x = np.asarray(x, dtype=float); y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    picked = np.empty(threshold, dtype=int)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        nxt_end = edges[i + 2] if i + 2 < len(edges) else n
+        # Vértice C = média do bucket seguinte
+        cx, cy = x[end:nxt_end].mean(), y[end:nxt_end].mean()
+        area = np.abs((x[a] - cx) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (cy - y[a]))
+        a = start + int(np.argmax(area))
+        picked[i + 1] = a
+    return picked
+
+def create_price_chart(df, price_range="Max", budget=POINT_BUDGET):
+    try:
+        if df is None or df.empty: return None
+        close = df['Close']
+        # Aceita o frame do motor de indicadores (médias já calculadas) ou o histórico OHLCV
+        sma = lambda w: df[f'SMA{w}'] if f'SMA{w}' in df else close.rolling(window=w).mean()
+        # Formato largo (uma linha por dia); o fold para formato longo é feito no browser
+        df_chart = pd.DataFrame({'Close': close, 'SMA50': sma(50), 'SMA200': sma(200)}).rename_axis('Date')
+        years = PRICE_RANGES.get(price_range)
+        if years: df_chart = df_chart[df_chart.index >= df_chart.index[-1] - pd.DateOffset(years=years)]
+        keep = lttb_indices(df_chart.index.asi8, df_chart['Close'].to_numpy(), budget)
+        df_chart = df_chart.iloc[keep].reset_index()
+
+        # Mapeamento de cores
+        domain = ['Close', 'SMA50', 'SMA200']
+        range_ = ['#333333', '#2ca02c', '#d62728'] # Preto, Verde, Vermelho
+
+        chart = alt.Chart(df_chart).transform_fold(domain, as_=['Metric', 'Price']).mark_line().encode(
+            x=alt.X('Date:T', axis=alt.Axis(title='', labelAngle=-45)),
+            y=alt.Y('Price:Q', axis=alt.Axis(title='Preço ($)')),
+            color=alt.Color('Metric:N', scale=alt.Scale(domain=domain, range=range_), legend=alt.Legend(title="Indicadores")),
+            strokeDash=alt.condition(
+                alt.datum.Metric == 'Close',
+                alt.value([0]),     # Linha sólida para o preço
+                alt.value([5, 5])   # Tracejada para SMAs
+            ),
+            tooltip=['Date:T', 'Metric:N', alt.Tooltip('Price:Q', format='$.2f')]
+        ).properties(height=350, title="Análise Técnica (Preço vs Médias)")
+        return chart
+    except: return None
+
+# Yield forward diária com a banda P10–P90 (e mediana) da janela da banda
+def create_yield_band_chart(series, band, years=5, budget=POINT_BUDGET):
+    try:
+        if series is None or series.empty or not band: return None
+        window = series[series.index >= series.index[-1] - pd.DateOffset(years=years)].dropna()
+        keep = lttb_indices(window.index.asi8, window.to_numpy(), budget)
+        df_chart = pd.DataFrame({'Date': window.index[keep], 'Yield': window.to_numpy()[keep]})
+        df_chart['P10'], df_chart['P50'], df_chart['P90'] = band['p10'], band['p50'], band['p90']
+
+        base = alt.Chart(df_chart).encode(x=alt.X('Date:T', axis=alt.Axis(title='', labelAngle=-45)))
+        area = base.mark_area(opacity=0.15, color='#228B22').encode(y=alt.Y('P10:Q', axis=alt.Axis(title='Yield (%)')), y2='P90:Q')
+        median = base.mark_rule(strokeDash=[5, 5], color='#228B22').encode(y='mean(P50):Q')
+        line = base.mark_line(color='#333333').encode(
+            y='Yield:Q', tooltip=['Date:T', alt.Tooltip('Yield:Q', format='.2f')]
+        )
+        return alt.layer(area, median, line).properties(height=300)
+    except: return None
+
+# --- SPEC CACHE ---
+# Spec Vega-Lite final por (ticker, versão dos dados, gráfico, estilo): os reruns não voltam a
+# construir frames nem a serializar. Os datasets ficam já em Arrow IPC, o formato que o
+# st.vega_lite_chart envia ao browser, e cada dataset aparece uma única vez no spec.
+SPEC_CACHE_SIZE = 256
+
+_specs = OrderedDict()
+_specs_lock = threading.Lock()
+
+def _arrow_bytes(records):
+    table = pa.Table.from_pylist(records)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer: writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def to_spec(chart):
+    if chart is None: return None
+    spec = chart.to_dict()
+    # Tamanho por omissão do tema altair: o Streamlit usa a largura do contentor
+    spec.get('config', {}).pop('view', None)
+    if spec.get('config') == {}: del spec['config']
+    spec['datasets'] = {name: _arrow_bytes(rows) for name, rows in spec.get('datasets', {}).items()}
+    return spec
+
+def cached_spec(key, builder, *args, **kwargs):
+    style = tuple(repr(a) for a in args if not isinstance(a, (pd.Series, pd.DataFrame)))
+    key = (*key, builder.__name__, style, tuple(sorted((k, repr(v)) for k, v in kwargs.items())))
+    with _specs_lock:
+        spec = _specs.get(key)
+        if spec is not None: _specs.move_to_end(key)
+    telemetry.count("chart_spec", result="hit" if spec is not None else "miss")
+    if spec is None:
+        spec = to_spec(builder(*args, **kwargs))
+        if spec is None: return None
+        with _specs_lock:
+            _specs[key] = spec
+            while len(_specs) > SPEC_CACHE_SIZE: _specs.popitem(last=False)
+    # O Streamlit retira 'datasets' do dict que recebe: entregar uma cópia rasa
+    return dict(spec)
@@ -0,0 +1,263 @@
+import os
+import pickle
+import socket
+import sqlite3
+import struct
+import threading
+import time
+import uuid
+from urllib.parse import urlparse
+
+import telemetry
+
+# --- PERSISTENT MARKET DATA STORE ---
+# Cache partilhado por todos os workers, chave (ticker, dataset). Backend escolhido por DASHBOARD_CACHE_URL:
+#   sqlite:///caminho/ficheiro.sqlite -> workers do mesmo host (por omissão, em DASHBOARD_STORE)
+#   redis://host:6379/0               -> réplicas em hosts diferentes (qualquer servidor compatível com Redis)
+# Os locks por chave garantem que só um worker descarrega cada (ticker, dataset); os outros esperam pelo valor.
+STORE_PATH = os.environ.get(
+    "DASHBOARD_STORE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "market_data.sqlite"),
+)
+CACHE_URL = os.environ.get("DASHBOARD_CACHE_URL", "")
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# Freshness por dataset (segundos): preços intraday, insiders diário, demonstrações semanal
+FRESHNESS = {
+    "history": 15 * MINUTE,
+    "info": 15 * MINUTE,
+    "fast_info": 15 * MINUTE,
+    "dividends": DAY,
+    "insider": DAY,
+    "financials": 7 * DAY,
+    "cashflow": 7 * DAY,
+    "balance": 7 * DAY,
+    "q_financials": 7 * DAY,
+    "q_balance": 7 * DAY,
+    "q_cashflow": 7 * DAY,
+    "peer_snapshot": 15 * MINUTE,
+    "symbol_search": 7 * DAY,
+    # Pesquisas sem resultado: o símbolo pode passar a existir (IPO, listagem nova)
+    "symbol_miss": HOUR,
+}
+DEFAULT_FRESHNESS = HOUR
+
+# Entradas expiradas continuam guardadas (fallback e histórico incremental) até RETENTION
+RETENTION = 30 * DAY
+# Lock de um download: expira sozinho se o worker morrer a meio
+LOCK_TTL = 30
+LOCK_WAIT = 20
+LOCK_POLL = 0.1
+
+_MISS = object()
+
+class SQLiteBackend:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS datasets ("
+                "ticker TEXT NOT NULL, dataset TEXT NOT NULL, fetched_at REAL NOT NULL, payload BLOB NOT NULL, "
+                "PRIMARY KEY (ticker, dataset))"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS locks (name TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL)")
+            self._local.conn = conn
+        return conn
+
+    def get(self, ticker, dataset):
+        return self._connect().execute(
+            "SELECT fetched_at, payload FROM datasets WHERE ticker = ? AND dataset = ?", (ticker, dataset)
+        ).fetchone()
+
+    def set(self, ticker, dataset, fetched_at, payload):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO datasets (ticker, dataset, fetched_at, payload) VALUES (?, ?, ?, ?)",
+                (ticker, dataset, fetched_at, payload),
+            )
+
+    def acquire(self, name, token, ttl):
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.execute("DELETE FROM locks WHERE name = ? AND expires_at < ?", (name, now))
+            return conn.execute(
+                "INSERT OR IGNORE INTO locks (name, token, expires_at) VALUES (?, ?, ?)", (name, token, now + ttl)
+            ).rowcount == 1
+
+    def locked(self, name):
+        row = self._connect().execute("SELECT expires_at FROM locks WHERE name = ?", (name,)).fetchone()
+        return row is not None and row[0] >= time.time()
+
+    def release(self, name, token):
+        conn = self._connect()
+        with conn: conn.execute("DELETE FROM locks WHERE name = ? AND token = ?", (name, token))
+
+# Cliente RESP mínimo (GET/SET/DEL/EXISTS): evita uma dependência só para quatro comandos
+class RedisBackend:
+    def __init__(self, url, prefix="dashboard"):
+        parsed = urlparse(url)
+        self.address = (parsed.hostname or "localhost", parsed.port or 6379)
+        self.db = int(parsed.path.strip("/") or 0)
+        self.password = parsed.password
+        self.prefix = prefix
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.create_connection(self.address, timeout=5)
+            conn = (sock, sock.makefile("rb"))
+            self._local.conn = conn
+            if self.password: self._call("AUTH", self.password)
+            if self.db: self._call("SELECT", self.db)
+        return conn
+
+    def _read(self, reader):
+        line = reader.readline()
+        if not line: raise ConnectionError("redis connection closed")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+": return body.decode()
+        if kind == b"-": raise RuntimeError(body.decode())
+        if kind == b":": return int(body)
+        if kind == b"$":
+            size = int(body)
+            if size < 0: return None
+            data = reader.read(size + 2)
+            return data[:-2]
+        if kind == b"*":
+            size = int(body)
+            return None if size < 0 else [self._read(reader) for _ in range(size)]
+        raise RuntimeError(f"unexpected redis reply {line!r}")
+
+    def _call(self, *args):
+        parts = [a if isinstance(a, bytes) else str(a).encode() for a in args]
+        request = b"*%d\r\n" % len(parts) + b"".join(b"$%d\r\n%s\r\n" % (len(p), p) for p in parts)
+        sock, reader = self._connect()
+        try:
+            sock.sendall(request)
+            return self._read(reader)
+        except (OSError, ConnectionError):
+            # Ligação partida: a próxima chamada volta a ligar
+            self._local.conn = None
+            sock.close()
+            raise
+
+    def _key(self, *parts):
+        return ":".join((self.prefix, *parts))
+
+    def get(self, ticker, dataset):
+        raw = self._call("GET", self._key("data", dataset, ticker))
+        if raw is None: return None
+        return struct.unpack("<d", raw[:8])[0], raw[8:]
+
+    def set(self, ticker, dataset, fetched_at, payload):
+        self._call("SET", self._key("data", dataset, ticker), struct.pack("<d", fetched_at) + payload, "EX", int(RETENTION))
+
+    def acquire(self, name, token, ttl):
+        return self._call("SET", self._key("lock", name), token, "NX", "PX", int(ttl * 1000)) == "OK"
+
+    def locked(self, name):
+        return self._call("EXISTS", self._key("lock", name)) == 1
+
+    # GET + DEL em vez de um script Lua: no pior caso (lock expirado e retomado entre os dois)
+    # outro worker repete um download, nunca grava dados errados
+    def release(self, name, token):
+        key = self._key("lock", name)
+        if self._call("GET", key) == token.encode(): self._call("DEL", key)
+
+def _make_backend(url):
+    scheme = urlparse(url).scheme
+    if scheme in ("redis", "rediss"): return RedisBackend(url)
+    if scheme == "sqlite": return SQLiteBackend(urlparse(url).path)
+    return SQLiteBackend(STORE_PATH)
+
+_backend = _make_backend(CACHE_URL)
+
+def configure(url):
+    global _backend
+    _backend = _make_backend(url)
+
+def load(ticker, dataset, max_age=None, default=None):
+    if max_age is None: max_age = FRESHNESS.get(dataset, DEFAULT_FRESHNESS)
+    try:
+        row = _backend.get(ticker, dataset)
+        if row is None or time.time() - row[0] > max_age:
+            telemetry.count("store", dataset=dataset, result="miss" if row is None else "stale")
+            return default
+        telemetry.count("store", dataset=dataset, result="hit")
+        return pickle.loads(row[1])
+    except Exception:
+        telemetry.count("store", dataset=dataset, result="error")
+        return default
+
+def save(ticker, dataset, value):
+    try:
+        _backend.set(ticker, dataset, time.time(), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        return True
+    except Exception:
+        telemetry.count("store", dataset=dataset, result="write_error")
+        return False
+
+# --- CROSS-WORKER LOCKS ---
+def _lock_name(ticker, dataset):
+    return f"{dataset}:{ticker}"
+
+# Token do lock, ou None se outro worker já estiver a descarregar. Com o backend em baixo
+# devolve um token na mesma: sem coordenação, cada worker descarrega por si.
+def acquire(ticker, dataset, ttl=LOCK_TTL):
+    token = uuid.uuid4().hex
+    try: return token if _backend.acquire(_lock_name(ticker, dataset), token, ttl) else None
+    except Exception:
+        telemetry.count("store_lock", dataset=dataset, result="error")
+        return token
+
+def release(ticker, dataset, token):
+    try: _backend.release(_lock_name(ticker, dataset), token)
+    except Exception: pass
+
+# Espera pelo valor que outro worker está a descarregar; devolve `default` se o lock
+# desaparecer sem valor novo (o download falhou) ou ao fim de `timeout`
+def wait_for(ticker, dataset, max_age=None, timeout=LOCK_WAIT, default=None):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL)
+        value = load(ticker, dataset, max_age, default=_MISS)
+        if value is not _MISS: return value
+        try:
+            if not _backend.locked(_lock_name(ticker, dataset)): break
+        except Exception: break
+    return default
+
+# Valor fresco do store ou `fetch()` gravado, com um único worker a descarregar cada chave
+def fetch_shared(ticker, dataset, fetch, max_age=None):
+    value = load(ticker, dataset, max_age, default=_MISS)
+    if value is not _MISS: return value
+    token = acquire(ticker, dataset)
+    if token is None:
+        telemetry.count("store_lock", dataset=dataset, result="wait")
+        value = wait_for(ticker, dataset, max_age, default=_MISS)
+        if value is not _MISS: return value
+        token = acquire(ticker, dataset)
+    try:
+        if token is not None:
+            # Outro worker pode ter acabado entre o primeiro load e o lock
+            value = load(ticker, dataset, max_age, default=_MISS)
+            if value is not _MISS: return value
+        value = fetch()
+        save(ticker, dataset, value)
+        return value
+    finally:
+        if token is not None: release(ticker, dataset, token)
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+# --- DIVIDEND ENGINE ---
+# Tudo a partir das datas ex-dividendo (sem reamostragens anuais repetidas):
+# TTM em cada ex-date, yield forward diário alinhado aos preços, CAGR móvel, séries de
+# aumentos / cortes e banda de percentis da yield.
+# Janela de 350 dias: 4 trimestrais / 12 mensais / 2 semestrais mesmo com datas a oscilar
+# alguns dias, sem apanhar o pagamento equivalente do ano anterior.
+TTM_WINDOW = "350D"
+MAX_FREQUENCY = 12
+# Sem ex-date há mais de 400 dias: dividendo suspenso (yield forward = 0)
+STALE_DAYS = 400
+CUT_THRESHOLD = 0.05
+CAGR_YEARS = (1, 3, 5, 10)
+BAND_YEARS = 5
+BAND_PERCENTILES = (10, 50, 90)
+
+def _naive(index):
+    return index.tz_localize(None) if getattr(index, 'tz', None) is not None else index
+
+def _clean(divs):
+    if divs is None or divs.empty: return pd.Series(dtype=float)
+    divs = divs[divs > 0].astype(float)
+    divs.index = _naive(pd.DatetimeIndex(divs.index)).normalize()
+    return divs.groupby(level=0).sum().sort_index()
+
+def ttm(divs):
+    return divs.rolling(TTM_WINDOW).sum()
+
+# Pagamentos por ano a partir da mediana dos últimos intervalos entre ex-dates
+def frequency(divs):
+    gaps = divs.index.to_series().diff().dt.days
+    freq = (365.25 / gaps.rolling(4, min_periods=1).median()).round().clip(1, MAX_FREQUENCY)
+    return freq.fillna(1)
+
+def forward_yield(divs, close):
+    close_index = _naive(pd.DatetimeIndex(close.index)).normalize()
+    if divs.empty: return pd.Series(0.0, index=close.index)
+    rate = divs * frequency(divs)
+    positions = np.searchsorted(divs.index.to_numpy(), close_index.to_numpy(), side='right') - 1
+    valid = positions >= 0
+    last = np.where(valid, positions, 0)
+    daily_rate = np.where(valid, rate.to_numpy()[last], 0.0)
+    age = (close_index.to_numpy() - divs.index.to_numpy()[last]) / np.timedelta64(1, 'D')
+    daily_rate = np.where(age > STALE_DAYS, 0.0, daily_rate)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return pd.Series(np.where(close.to_numpy() > 0, daily_rate / close.to_numpy() * 100, np.nan), index=close.index)
+
+# CAGR do TTM entre cada ex-date e o TTM em vigor `years` antes (anos de 365.25 dias: o TTM só
+# muda nas ex-dates, um dia a mais ou a menos não altera o valor encontrado). No primeiro TTM_WINDOW
+# do histórico o TTM ainda é uma soma parcial: não serve de base.
+def rolling_cagr(ttm_series, years):
+    if ttm_series.empty: return ttm_series
+    dates = ttm_series.index.to_numpy()
+    prior_dates = dates - np.timedelta64(round(365.25 * years), 'D')
+    positions = np.searchsorted(dates, prior_dates, side='right') - 1
+    values = ttm_series.to_numpy()
+    full = prior_dates >= (ttm_series.index[0] + pd.Timedelta(TTM_WINDOW)).to_datetime64()
+    prior = np.where((positions >= 0) & full, values[np.clip(positions, 0, None)], np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cagr = (values / np.where(prior > 0, prior, np.nan)) ** (1 / years) - 1
+    return pd.Series(cagr * 100, index=ttm_series.index)
+
+# Soma dos últimos N pagamentos em cada ex-date (N = pagamentos por ano): ao contrário da soma por ano
+# civil ou da janela de 350 dias, um pagamento que passa de dezembro para janeiro não altera o valor
+def annual_rate(divs):
+    counts = frequency(divs).to_numpy().astype(int)
+    totals = np.concatenate([[0.0], np.cumsum(divs.to_numpy())])
+    end = np.arange(1, len(divs) + 1)
+    start = end - counts
+    rate = np.where(start >= 0, totals[end] - totals[np.clip(start, 0, None)], np.nan)
+    return pd.Series(rate, index=divs.index)
+
+# Taxa anual na última ex-date de cada ano civil completo (o ano corrente, ainda parcial, não conta
+# para aumentos/cortes)
+def completed_years(divs, as_of):
+    rate = annual_rate(divs).dropna()
+    annual = rate.groupby(rate.index.year).last()
+    return annual[annual.index < as_of.year]
+
+def streaks(annual):
+    if len(annual) < 2: return 0, None
+    growth = (annual.diff() > 0).to_numpy()[1:]
+    # Anos consecutivos de aumento a contar do último ano completo
+    streak = int(np.cumprod(growth[::-1]).sum())
+    cuts = annual.index[1:][(annual.pct_change() < -CUT_THRESHOLD).to_numpy()[1:]]
+    return streak, (int(cuts[-1]) if len(cuts) else None)
+
+def yield_band(daily_yield, years=BAND_YEARS):
+    if daily_yield.empty: return None
+    window = daily_yield[daily_yield.index >= daily_yield.index[-1] - pd.DateOffset(years=years)].dropna()
+    window = window[window > 0]
+    if window.empty: return None
+    current = daily_yield.iloc[-1]
+    band = {f"p{p}": float(v) for p, v in zip(BAND_PERCENTILES, np.percentile(window.to_numpy(), BAND_PERCENTILES))}
+    band.update({'mean': float(window.mean()), 'current': float(current),
+                 'percentile': float((window.to_numpy() < current).mean() * 100)})
+    return band
+
+def analyze(divs, close):
+    divs = _clean(divs)
+    if divs.empty or close is None or close.empty: return None
+    as_of = _naive(pd.DatetimeIndex(close.index[-1:]))[0]
+    ttm_series = ttm(divs)
+    daily_yield = forward_yield(divs, close)
+    annual = completed_years(divs, as_of)
+    streak, last_cut = streaks(annual)
+    cagr = {}
+    for years in CAGR_YEARS:
+        # CAGR na última ex-date; sem histórico suficiente para essa janela fica 0 (não o de uma ex-date antiga)
+        series = rolling_cagr(ttm_series, years)
+        cagr[years] = float(series.iloc[-1]) if not series.empty and pd.notna(series.iloc[-1]) else 0.0
+    return {'ttm': ttm_series, 'forward_yield': daily_yield, 'annual': annual, 'cagr': cagr,
+            'streak': streak, 'last_cut': last_cut, 'band': yield_band(daily_yield)}
@@ -0,0 +1,169 @@
+import argparse
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import market_data
+import metrics
+import screener
+
+# --- STREAMING EXPORT ---
+# Exportação de muitos tickers em formato longo (Ticker, Section, Item, Date, Value, Text): demonstrações
+# em bruto, séries derivadas e scores. Os tickers são processados em blocos e cada bloco é escrito e
+# libertado antes do seguinte (um row group Parquet / um pedaço de CSV), por isso a memória não cresce
+# com o número de tickers.
+CHUNK_TICKERS = 25
+MAX_WORKERS = 8
+FORMATS = ("parquet", "csv")
+
+SCHEMA = pa.schema([
+    ("Ticker", pa.string()), ("Section", pa.string()), ("Item", pa.string()),
+    ("Date", pa.timestamp("ns")), ("Value", pa.float64()), ("Text", pa.string()),
+])
+COLUMNS = SCHEMA.names
+STATEMENTS = ("financials", "cashflow", "balance", "q_financials", "q_balance", "q_cashflow")
+SERIES = {
+    "cash_per_share": 'series_affo_share', "gross_margin": 'series_gross_margin', "roic": 'series_roic',
+    "dividends": 'series_divs_history', "yield": 'series_yield_history',
+}
+
+def _dates(index):
+    # Séries anuais vêm indexadas por ano (int): ficam no último dia do ano
+    if not isinstance(index, pd.DatetimeIndex): return pd.to_datetime([f"{int(y)}-12-31" for y in index])
+    return index.tz_localize(None) if index.tz is not None else index
+
+def _frame(ticker, section, items, dates, values, text=None):
+    n = len(values)
+    return pd.DataFrame({
+        "Ticker": ticker, "Section": section, "Item": items, "Date": dates,
+        "Value": pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float),
+        "Text": text if text is not None else pd.Series([None] * n, dtype=object),
+    }, index=range(n))
+
+def _statement(ticker, name, df):
+    if df is None or df.empty: return None
+    long = df.stack().dropna()
+    items = long.index.get_level_values(0).astype(str)
+    return _frame(ticker, f"statement:{name}", items, _dates(pd.DatetimeIndex(long.index.get_level_values(1))), long.to_numpy())
+
+def _series(ticker, item, series):
+    if series is None or series.empty: return None
+    return _frame(ticker, "series", item, _dates(series.index), series.to_numpy())
+
+def _scores(ticker, row):
+    items = [k for k in row if k != "Ticker"]
+    values = [row[k] if isinstance(row[k], (int, float, np.number)) else np.nan for k in items]
+    text = pd.Series([None if isinstance(row[k], (int, float, np.number)) else row[k] for k in items], dtype=object)
+    return _frame(ticker, "score", items, pd.NaT, values, text)
+
+def _load(ticker):
+    try:
+        bundle = market_data.load_bundle(ticker)
+        if bundle is None: return None
+        m = metrics.compute_metrics(bundle)
+        row, batch_inputs = screener.score_bundle(ticker, bundle, m)
+        parts = [_statement(ticker, name, bundle.get(name)) for name in STATEMENTS]
+        parts += [_series(ticker, item, m.get(key)) for item, key in SERIES.items()]
+        # Só as partes longas ficam em memória; o bundle e as métricas são libertados aqui
+        return row, batch_inputs, [p for p in parts if p is not None]
+    except Exception: return None
+
+# Um DataFrame longo por bloco de tickers (os scores em lote do screener são calculados por bloco)
+def iter_chunks(tickers, chunk_size=CHUNK_TICKERS, max_workers=MAX_WORKERS):
+    tickers = list(dict.fromkeys(tickers))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export") as pool:
+        for start in range(0, len(tickers), chunk_size):
+            results = [r for r in pool.map(_load, tickers[start:start + chunk_size]) if r is not None]
+            if not results: continue
+            rows = [r[0] for r in results]
+            screener.apply_batch_scores(rows, [r[1] for r in results])
+            parts = [p for r in results for p in r[2]] + [_scores(row["Ticker"], row) for row in rows]
+            yield pd.concat(parts, ignore_index=True)[COLUMNS]
+
+def iter_csv(tickers, **kwargs):
+    header = True
+    for chunk in iter_chunks(tickers, **kwargs):
+        yield chunk.to_csv(index=False, header=header).encode("utf-8")
+        header = False
+    if header: yield (",".join(COLUMNS) + "\n").encode("utf-8")
+
+# Destino do ParquetWriter que entrega os bytes escritos a cada row group em vez de os acumular
+class _Drain:
+    def __init__(self):
+        self.parts, self.position, self.closed = [], 0, False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+def iter_parquet(tickers, **kwargs):
+    sink = _Drain()
+    writer = pq.ParquetWriter(sink, SCHEMA)
+    for chunk in iter_chunks(tickers, **kwargs):
+        writer.write_table(pa.Table.from_pandas(chunk, schema=SCHEMA, preserve_index=False))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+def stream(tickers, fmt="parquet", **kwargs):
+    if fmt not in FORMATS: raise ValueError(f"unknown export format: {fmt}")
+    return iter_parquet(tickers, **kwargs) if fmt == "parquet" else iter_csv(tickers, **kwargs)
+
+def write(tickers, path, fmt="parquet", **kwargs):
+    with open(path, "wb") as f:
+        for data in stream(tickers, fmt, **kwargs): f.write(data)
+    return path
+
+# Para o st.download_button: os blocos vão para um ficheiro temporário (a construção não acumula bytes)
+# e devolve-se um BufferedReader, que o Streamlit aceita. O Streamlit lê-o inteiro para memória ao servir
+# o download; para exportações grandes usar o CLI. O ficheiro desaparece quando o reader é fechado.
+def to_file(tickers, fmt="parquet", **kwargs):
+    with tempfile.NamedTemporaryFile(suffix=f".{fmt}", delete=False) as f: path = f.name
+    try:
+        write(tickers, path, fmt, **kwargs)
+        # Windows: O_TEMPORARY apaga ao fechar; POSIX: apaga já, o descritor aberto mantém os dados
+        reader = os.fdopen(os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0) | getattr(os, "O_TEMPORARY", 0)), "rb")
+    except BaseException:
+        os.remove(path)
+        raise
+    if os.name != "nt": os.remove(path)
+    return reader
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exportação em streaming (Parquet/CSV) de vários tickers")
+    parser.add_argument("tickers", nargs="*", metavar="TICKER")
+    parser.add_argument("--file", help="CSV (coluna Symbol/Ticker) ou lista de símbolos")
+    parser.add_argument("--format", choices=FORMATS, default="parquet")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--chunk", type=int, default=CHUNK_TICKERS)
+    args = parser.parse_args(argv)
+    csv_bytes = None
+    if args.file:
+        with open(args.file, "rb") as f: csv_bytes = f.read()
+    tickers = screener.parse_universe(" ".join(args.tickers), csv_bytes)
+    if not tickers: parser.error("nenhum símbolo")
+    print(write(tickers, args.out, args.format, chunk_size=args.chunk))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import re
+
+# --- NORMALIZED LINE-ITEM INDEX ---
+# Métrica canónica -> nomes exatos das linhas (por prioridade). Os nomes são normalizados
+# (minúsculas, só letras/dígitos), por isso "EBIT" nunca apanha "EBITDA".
+LINE_ALIASES = {
+    "net_income": ["net income", "net income from continuing operations", "net income common stockholders",
+                   "net income including noncontrolling interests"],
+    "depreciation": ["depreciation and amortization", "depreciation amortization depletion", "depreciation",
+                     "reconciled depreciation", "depreciation and amortization in income statement"],
+    "capex": ["capital expenditure", "capital expenditures", "purchase of ppe", "net ppe purchase and sale"],
+    "shares_issued": ["share issued", "ordinary shares number"],
+    "avg_shares": ["basic average shares", "diluted average shares"],
+    "operating_cash_flow": ["operating cash flow", "cash flow from continuing operating activities",
+                            "total cash from operating activities"],
+    "dividends_paid": ["cash dividends paid", "common stock dividend paid", "dividends paid"],
+    "free_cash_flow": ["free cash flow"],
+    "eps": ["basic eps", "diluted eps"],
+    "total_debt": ["total debt", "long term debt", "long term debt and capital lease obligation"],
+    "gross_profit": ["gross profit"],
+    "revenue": ["total revenue", "operating revenue"],
+    "cash": ["cash and cash equivalents", "cash cash equivalents and short term investments", "cash financial",
+             "cash", "cash & equivalents"],
+    "ebitda": ["ebitda", "normalized ebitda"],
+    "ebit": ["ebit", "operating income"],
+    "interest_expense": ["interest expense", "interest expense non operating"],
+    "total_equity": ["total equity gross minority interest", "stockholders equity", "total stockholder equity",
+                     "common stock equity"],
+    "total_assets": ["total assets"],
+    "total_liabilities": ["total liabilities net minority interest", "total liabilities", "total debt"],
+    "current_assets": ["current assets", "total current assets"],
+    "current_liabilities": ["current liabilities", "total current liabilities"],
+    "retained_earnings": ["retained earnings", "accumulated deficit"],
+    "sga": ["selling general and administration", "selling general and administrative"],
+}
+
+STATEMENTS = ("financials", "cashflow", "balance", "q_financials", "q_balance", "q_cashflow")
+
+def _normalize(label):
+    return re.sub(r'[^a-z0-9]', '', str(label).lower())
+
+def index_statement(df):
+    lines = {}
+    if df is None or df.empty: return lines
+    rows = {}
+    for pos, label in enumerate(df.index): rows.setdefault(_normalize(label), pos)
+    for metric, aliases in LINE_ALIASES.items():
+        for alias in aliases:
+            pos = rows.get(_normalize(alias))
+            if pos is not None:
+                lines[metric] = df.iloc[pos].sort_index()
+                break
+    return lines
+
+def index_bundle(bundle):
+    return {name: index_statement(bundle.get(name)) for name in STATEMENTS}
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+import data_store
+
+# --- TECHNICAL INDICATOR ENGINE ---
+# Indicadores recursivos (EMA, MACD, RSI, ATR, máximo acumulado) continuam a partir da última linha
+# calculada; os de janela (SMA, Bollinger, volatilidade, beta) só precisam de LOOKBACK barras antes
+# da cauda. Uma atualização incremental do histórico custa O(barras novas + LOOKBACK).
+EMA_SPANS = (12, 26)
+MACD_SIGNAL = 9
+RSI_PERIOD = 14
+ATR_PERIOD = 14
+SMA_WINDOWS = (50, 200)
+BOLLINGER_WINDOW = 20
+BOLLINGER_K = 2
+VOL_WINDOW = 63
+BETA_WINDOW = 252
+TRADING_DAYS = 252
+LOOKBACK = max(*SMA_WINDOWS, BOLLINGER_WINDOW, VOL_WINDOW + 1, BETA_WINDOW + 1)
+
+# y_t = (1 - alpha) * y_{t-1} + alpha * x_t, a continuar de `seed` (o último valor já calculado)
+def _ewm(values, alpha, seed=None):
+    s = pd.Series(values, dtype=float)
+    if seed is None or pd.isna(seed): return s.ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return pd.concat([pd.Series([seed]), s], ignore_index=True).ewm(alpha=alpha, adjust=False).mean().to_numpy()[1:]
+
+def _recursive(bars, prev, start):
+    seed = lambda col: None if prev is None else prev[col]
+    close = bars['Close'].to_numpy(dtype=float)
+    high = bars['High'].to_numpy(dtype=float) if 'High' in bars else close
+    low = bars['Low'].to_numpy(dtype=float) if 'Low' in bars else close
+    prev_close = np.concatenate([[np.nan if prev is None else prev['Close']], close[:-1]])
+    # Barras ainda dentro do período de aquecimento (posição global)
+    warm = np.arange(start, start + len(bars))
+
+    out = {f'EMA{span}': _ewm(close, 2 / (span + 1), seed(f'EMA{span}')) for span in EMA_SPANS}
+    out['MACD'] = out[f'EMA{EMA_SPANS[0]}'] - out[f'EMA{EMA_SPANS[1]}']
+    out['Signal'] = _ewm(out['MACD'], 2 / (MACD_SIGNAL + 1), seed('Signal'))
+    out['MACD_Hist'] = out['MACD'] - out['Signal']
+
+    delta = np.nan_to_num(close - prev_close)
+    out['AvgGain'] = _ewm(np.clip(delta, 0, None), 1 / RSI_PERIOD, seed('AvgGain'))
+    out['AvgLoss'] = _ewm(np.clip(-delta, 0, None), 1 / RSI_PERIOD, seed('AvgLoss'))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(out['AvgLoss'] > 0, 100 - 100 / (1 + out['AvgGain'] / out['AvgLoss']), 100.0)
+    out['RSI'] = np.where(warm >= RSI_PERIOD, rsi, np.nan)
+
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    atr = _ewm(tr, 1 / ATR_PERIOD, seed('ATR_raw'))
+    out['ATR_raw'] = atr
+    out['ATR'] = np.where(warm >= ATR_PERIOD, atr, np.nan)
+
+    out['Peak'] = np.fmax.accumulate(np.concatenate([[seed('Peak') if prev is not None else -np.inf], close]))[1:]
+    out['Drawdown'] = close / out['Peak'] - 1
+    return pd.DataFrame(out, index=bars.index)
+
+def _dates(index):
+    return (index.tz_localize(None) if index.tz is not None else index).normalize()
+
+def _windowed(window, benchmark):
+    close = window['Close'].astype(float)
+    out = pd.DataFrame(index=window.index)
+    for w in SMA_WINDOWS: out[f'SMA{w}'] = close.rolling(w).mean()
+    mid, std = close.rolling(BOLLINGER_WINDOW).mean(), close.rolling(BOLLINGER_WINDOW).std(ddof=0)
+    out['BB_Mid'], out['BB_Upper'], out['BB_Lower'] = mid, mid + BOLLINGER_K * std, mid - BOLLINGER_K * std
+    returns = np.log(close).diff()
+    out['Volatility'] = returns.rolling(VOL_WINDOW).std() * np.sqrt(TRADING_DAYS)
+    out['Beta'] = np.nan
+    if benchmark is not None and not benchmark.empty:
+        bench = pd.Series(benchmark.to_numpy(dtype=float), index=_dates(benchmark.index))
+        bench = bench[~bench.index.duplicated(keep='last')].sort_index()
+        bench_close = pd.Series(bench.reindex(_dates(window.index), method='ffill').to_numpy(), index=window.index)
+        bench_ret = np.log(bench_close).diff()
+        out['Beta'] = returns.rolling(BETA_WINDOW).cov(bench_ret) / bench_ret.rolling(BETA_WINDOW).var()
+    return out
+
+def _compute(history, benchmark, start=0, prev=None):
+    bars = history.iloc[start:]
+    window = history.iloc[max(0, start - LOOKBACK):]
+    return pd.concat([bars[['Close']].astype(float), _recursive(bars, prev, start), _windowed(window, benchmark).iloc[-len(bars):]], axis=1)
+
+def compute(history, benchmark=None):
+    if history is None or history.empty: return pd.DataFrame()
+    return _compute(history, benchmark)
+
+# Reaproveita o frame anterior se o histórico até à penúltima linha não mudou
+# (a última barra pode ter sido intraday e é sempre recalculada)
+def extend(frame, history, benchmark=None):
+    resume = len(frame) - 2
+    if resume < 0 or len(history) <= resume: return compute(history, benchmark)
+    date = frame.index[resume]
+    if history.index[resume] != date or not np.isclose(history['Close'].iloc[resume], frame['Close'].iloc[resume], rtol=1e-9):
+        return compute(history, benchmark)
+    tail = _compute(history, benchmark, resume + 1, frame.iloc[resume])
+    return pd.concat([frame.iloc[:resume + 1], tail])
+
+def for_ticker(ticker, history, benchmark=None):
+    if history is None or history.empty: return pd.DataFrame()
+    cached = data_store.load(ticker, "indicators", max_age=float('inf'))
+    if cached is not None and cached['has_benchmark'] == (benchmark is not None):
+        frame = extend(cached['frame'], history, benchmark)
+    else: frame = compute(history, benchmark)
+    data_store.save(ticker, "indicators", {'frame': frame, 'has_benchmark': benchmark is not None})
+    return frame
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+# --- INSIDER ANALYTICS ---
+# Classificação e agregação vetorizadas sobre todas as transações (sem iterrows):
+# compras/vendas em mercado pelo texto do Yahoo, janelas de 3/6/12 meses e repartição por cargo.
+WINDOWS = {"3M": 3, "6M": 6, "12M": 12}
+HEADLINE_WINDOW = "12M"
+
+# Primeira regra que bate define o cargo (CEO antes de Director em "CEO and Director")
+ROLE_PATTERNS = [
+    ("CEO", r"chief executive|\bceo\b|(?<!vice )president"),
+    ("CFO", r"chief financial|\bcfo\b"),
+    ("Officer", r"officer|chief|\bcoo\b|\bcto\b|general counsel|vice president|\bevp\b|\bsvp\b"),
+    ("Director", r"director|chairman|board"),
+    ("10% Owner", r"beneficial owner|10%"),
+]
+OTHER_ROLE = "Other"
+
+WINDOW_COLUMNS = {"Buys": "int64", "Sells": "int64", "Bought $": "float64", "Sold $": "float64", "Net $": "float64"}
+
+def _column(tx, name, default=""):
+    return tx[name] if name in tx.columns else pd.Series(default, index=tx.index)
+
+# +1 compra, -1 venda, 0 para prémios/doações/exercício de opções (não são decisões de mercado)
+def classify(tx):
+    text = _column(tx, 'Text').fillna("").astype(str).str.lower()
+    if 'Transaction' in tx.columns: text = text + " " + tx['Transaction'].fillna("").astype(str).str.lower()
+    sale = text.str.contains("sale", regex=False).to_numpy()
+    purchase = text.str.contains("purchase", regex=False).to_numpy()
+    return np.where(sale, -1, np.where(purchase, 1, 0))
+
+# Os cargos repetem-se muito: classifica só os valores distintos e expande pelos códigos
+def roles(tx):
+    codes, positions = pd.factorize(_column(tx, 'Position').fillna("").astype(str).str.lower())
+    positions = pd.Series(positions, dtype=object)
+    conditions = [positions.str.contains(pattern, regex=True).to_numpy(dtype=bool) for _, pattern in ROLE_PATTERNS]
+    unique_roles = np.select(conditions, [role for role, _ in ROLE_PATTERNS], default=OTHER_ROLE)
+    return unique_roles[codes] if len(unique_roles) else np.full(len(codes), OTHER_ROLE)
+
+def _frame(tx):
+    value = pd.to_numeric(_column(tx, 'Value', np.nan), errors='coerce').fillna(0).abs().to_numpy()
+    dates = pd.to_datetime(_column(tx, 'Start Date', pd.NaT), errors='coerce')
+    if getattr(dates.dt, 'tz', None) is not None: dates = dates.dt.tz_localize(None)
+    direction = classify(tx)
+    buys, sells = direction == 1, direction == -1
+    # Colunas na ordem de WINDOW_COLUMNS: Buys, Sells, Bought $, Sold $, Net $
+    parts = np.column_stack([buys, sells, np.where(buys, value, 0.0), np.where(sells, value, 0.0),
+                             np.where(buys, value, 0.0) - np.where(sells, value, 0.0)])
+    return dates.to_numpy(), parts
+
+def summarize(tx, as_of=None):
+    empty = pd.DataFrame(0, index=list(WINDOWS), columns=list(WINDOW_COLUMNS)).astype(WINDOW_COLUMNS)
+    if tx is None or tx.empty: return {'windows': empty, 'roles': pd.DataFrame(columns=list(WINDOW_COLUMNS))}
+    dates, parts = _frame(tx)
+    as_of = pd.Timestamp.now().normalize() if as_of is None else pd.Timestamp(as_of)
+    masks = {name: dates >= (as_of - pd.DateOffset(months=months)).to_datetime64() for name, months in WINDOWS.items()}
+    windows = pd.DataFrame([parts[mask].sum(axis=0) for mask in masks.values()],
+                           index=list(WINDOWS), columns=list(WINDOW_COLUMNS)).astype(WINDOW_COLUMNS)
+    headline = masks[HEADLINE_WINDOW]
+    by_role = (pd.DataFrame(parts[headline], columns=list(WINDOW_COLUMNS)).groupby(roles(tx)[headline]).sum()
+               .astype(WINDOW_COLUMNS).rename_axis('role').sort_values('Net $'))
+    return {'windows': windows, 'roles': by_role}
@@ -0,0 +1,220 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+import data_store
+import fundamentals
+import indicators
+import outbound
+import quarterly
+import telemetry
+
+# --- YAHOO DATASETS ---
+HISTORY_PERIOD = "max"
+# Referência para o beta móvel
+BENCHMARK = "SPY"
+
+def _fast_info(stock):
+    fi = stock.fast_info
+    return {'last_price': fi.last_price, 'market_cap': fi.market_cap}
+
+FETCHERS = {
+    "history": lambda stock: stock.history(period=HISTORY_PERIOD),
+    "info": lambda stock: stock.info,
+    "fast_info": _fast_info,
+    "insider": lambda stock: stock.insider_transactions,
+    "financials": lambda stock: stock.financials,
+    "cashflow": lambda stock: stock.cashflow,
+    "balance": lambda stock: stock.balance_sheet,
+    "dividends": lambda stock: stock.dividends,
+    "q_financials": lambda stock: stock.quarterly_financials,
+    "q_balance": lambda stock: stock.quarterly_balance_sheet,
+    "q_cashflow": lambda stock: stock.quarterly_cashflow,
+}
+
+# Timeout (s) por dataset, contado a partir do momento em que o pedido sai da fila (pool de threads +
+# token bucket do scheduler) e incluindo as retentativas
+TIMEOUTS = {
+    "history": 20, "info": 12, "fast_info": 8, "insider": 12, "dividends": 12,
+    "financials": 15, "cashflow": 15, "balance": 15,
+    "q_financials": 15, "q_balance": 15, "q_cashflow": 15,
+}
+# Espera máxima na fila antes do timeout do dataset começar a contar: em lotes (screener, portfólio)
+# centenas de pedidos partilham os 5 pedidos/s do Yahoo
+QUEUE_TIMEOUT = 120
+DISPATCH_POLL = 0.25
+
+# Valor devolvido quando um dataset falha (não é gravado no store)
+def _empty(name):
+    if name in ("info", "fast_info"): return {}
+    if name == "insider": return None
+    if name == "dividends": return pd.Series(dtype=float)
+    return pd.DataFrame()
+
+# Pool partilhado: os pedidos que excedem o timeout continuam em fundo e aquecem o store
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="yahoo")
+
+_MISS = object()
+
+# Momento em que o pedido de um dataset saiu da fila (None enquanto espera por thread ou token)
+class _Job:
+    def __init__(self):
+        self.dispatched_at = None
+
+_current_job = threading.local()
+
+def _mark_dispatched():
+    job = getattr(_current_job, "job", None)
+    if job is not None and job.dispatched_at is None: job.dispatched_at = time.monotonic()
+
+# Chave do scheduler partilhada com peers.py: um .info pedido pelos dois módulos só sai uma vez
+def _yahoo(stock, ticker, name, fn, attempts=outbound.MAX_ATTEMPTS):
+    def call():
+        _mark_dispatched()
+        with telemetry.timed("yahoo", name, ticker=ticker): return fn(stock)
+    return outbound.request("yahoo", f"{name}:{ticker}", call, attempts, max_wait=QUEUE_TIMEOUT)
+
+# Datasets que o Yahoo devolve sempre preenchidos: vazio/None é uma falha do yfinance que não levantou
+# exceção. Levanta-se aqui para não ir para o store e para servir a cópia antiga (ou marcar em falta).
+REQUIRED = ("history", "info", "financials", "cashflow", "balance")
+
+class EmptyResponse(ValueError):
+    pass
+
+def _download(stock, ticker, name):
+    value = _yahoo(stock, ticker, name, FETCHERS[name])
+    if name in REQUIRED and (value is None or len(value) == 0):
+        telemetry.count("empty_response", dataset=name)
+        raise EmptyResponse(f"empty {name} for {ticker}")
+    return _empty(name) if value is None else value
+
+# Só um worker (de todas as réplicas) descarrega cada dataset; os outros esperam pelo valor no store
+def _fetch_dataset(stock, ticker, name):
+    return data_store.fetch_shared(ticker, name, lambda: _download(stock, ticker, name))
+
+# --- INCREMENTAL PRICE HISTORY ---
+# Só descarrega as barras desde a última guardada; recarrega o histórico inteiro se houver split/dividendo
+# (os preços ajustados do histórico inteiro mudam) ou se a barra de referência não bater certo.
+def _append_history(stock, stored):
+    if len(stored) < 2: return None
+    anchor = stored.index[-2]  # a última barra pode ser intraday (incompleta)
+    new_bars = stock.history(start=anchor.strftime('%Y-%m-%d'))
+    if new_bars.empty or anchor not in new_bars.index: return None
+    # Só eventos novos: os da âncora e da última barra guardada (pode ser ex-date) já estão no histórico
+    after = new_bars[new_bars.index > anchor]
+    for col in ['Dividends', 'Stock Splits']:
+        if col not in after.columns: continue
+        known = stored[col].reindex(after.index) if col in stored.columns else pd.Series(np.nan, index=after.index)
+        if (after[col].fillna(0) != known.fillna(0)).any(): return None
+    if not np.isclose(new_bars.at[anchor, 'Close'], stored.at[anchor, 'Close'], rtol=1e-4): return None
+    return pd.concat([stored[stored.index < anchor], new_bars[new_bars.index >= anchor]])
+
+def _download_history(stock, ticker):
+    history = None
+    stored = data_store.load(ticker, "history", max_age=float('inf'))
+    if stored is not None and not stored.empty:
+        # Uma só tentativa: se falhar, o download completo é o fallback
+        try: history = _yahoo(stock, ticker, "history_append", lambda s: _append_history(s, stored), attempts=1)
+        except Exception: history = None
+    if history is None: history = _download(stock, ticker, "history")
+    if history.empty: raise ValueError(f"No price history for {ticker}")
+    return history
+
+def _fetch_history(stock, ticker):
+    return data_store.fetch_shared(ticker, "history", lambda: _download_history(stock, ticker))
+
+# --- CONCURRENT BUNDLE ---
+# Retentativas, rate limit e circuit breaker ficam no scheduler (outbound); se mesmo assim o
+# Yahoo falhar, serve-se a última cópia guardada, por mais antiga que seja
+def _fetch_or_stale(ticker, name):
+    # Um yf.Ticker por dataset: os objetos do yfinance não são seguros entre threads
+    stock = yf.Ticker(ticker)
+    try:
+        if name == "history": return _fetch_history(stock, ticker)
+        value = _fetch_dataset(stock, ticker, name)
+        # Entradas antigas do store podem ter guardado um None do yfinance
+        return _empty(name) if value is None else value
+    except Exception:
+        stale = data_store.load(ticker, name, max_age=float('inf'), default=_MISS)
+        if stale is _MISS: raise
+        telemetry.count("stale_fallback", dataset=name, ticker=ticker)
+        return stale
+
+def _run_job(job, ticker, name):
+    _current_job.job = job
+    try: return _fetch_or_stale(ticker, name)
+    finally: _current_job.job = None
+
+# Pedidos em curso partilhados: load_quote e load_bundle do mesmo ticker esperam pelos mesmos futures
+_inflight = {}
+_inflight_lock = threading.RLock()
+
+def _forget(key):
+    with _inflight_lock: _inflight.pop(key, None)
+
+def _submit(ticker, name):
+    key = (ticker, name)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is None:
+            job = _Job()
+            future = _executor.submit(_run_job, job, ticker, name)
+            future.job = job
+            _inflight[key] = future
+            future.add_done_callback(lambda _, key=key: _forget(key))
+    return future
+
+def _submit_all(ticker):
+    futures = {name: _submit(ticker, name) for name in FETCHERS}
+    return futures, (_submit(BENCHMARK, "history") if ticker != BENCHMARK else None)
+
+# Resultado do dataset: TIMEOUTS[name] conta desde a saída da fila; enquanto o pedido está na fila
+# (ou à espera de outro worker/pedido igual) o limite é QUEUE_TIMEOUT a partir de `start`
+def _result(future, name, start):
+    while True:
+        dispatched = future.job.dispatched_at
+        deadline = (start + QUEUE_TIMEOUT if dispatched is None else dispatched) + TIMEOUTS[name]
+        wait = max(0, deadline - time.monotonic())
+        if dispatched is None: wait = min(wait, DISPATCH_POLL)
+        try: return future.result(timeout=wait)
+        except TimeoutError:
+            if dispatched is not None or time.monotonic() >= deadline: raise
+
+# Só info + fast_info (cabeçalho da página); os restantes datasets ficam já a descarregar em fundo
+QUOTE_DATASETS = ("info", "fast_info")
+
+def load_quote(ticker):
+    start = time.monotonic()
+    futures, _ = _submit_all(ticker)
+    quote = {}
+    for name in QUOTE_DATASETS:
+        try: quote[name] = _result(futures[name], name, start)
+        except Exception: quote[name] = _empty(name)
+    return quote
+
+def load_bundle(ticker):
+    start = time.monotonic()
+    futures, bench_future = _submit_all(ticker)
+    bundle, missing = {}, []
+    for name, future in futures.items():
+        try: bundle[name] = _result(future, name, start)
+        except Exception as exc:
+            telemetry.count("missing", dataset=name, ticker=ticker, reason="timeout" if isinstance(exc, TimeoutError) else "error")
+            bundle[name] = _empty(name)
+            missing.append(name)
+    telemetry.record("stage", "load_bundle", (time.monotonic() - start) * 1000, "ok" if not missing else "partial", ticker=ticker)
+    if "history" in missing: return None
+    bundle["missing"] = missing
+    bundle["lines"] = fundamentals.index_bundle(bundle)
+    bundle["ttm"] = quarterly.for_ticker(ticker, bundle["lines"])
+    benchmark = bundle["history"]["Close"]
+    if bench_future is not None:
+        try: benchmark = _result(bench_future, "history", start)["Close"]
+        except Exception: benchmark = None
+    bundle["indicators"] = indicators.for_ticker(ticker, bundle["history"], benchmark)
+    bundle["version"] = time.time()
+    return bundle
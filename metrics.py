@@ -0,0 +1,412 @@
+import numpy as np
+import pandas as pd
+
+import dividends
+import insiders
+import quarterly
+
+# --- HELPER FUNCTIONS ---
+def safe_get(data_dict, key, default=0):
+    if not isinstance(data_dict, dict): return default
+    val = data_dict.get(key)
+    return val if val is not None else default
+
+# Valor TTM do último trimestre, ou `fallback` (último ano fiscal) se faltar
+def _current(ttm_now, key, fallback):
+    val = ttm_now.get(key)
+    return fallback if val is None or not np.isfinite(val) else val
+
+def align_annual_data(dict_series):
+    try:
+        df_final = pd.DataFrame()
+        for name, series in dict_series.items():
+            if series is not None and not series.empty:
+                series_year = series.groupby(series.index.year).sum()
+                df_temp = pd.DataFrame({name: series_year})
+                if df_final.empty: df_final = df_temp
+                else: df_final = df_final.join(df_temp, how='outer')
+        return df_final
+    except: return pd.DataFrame()
+
+def format_large_number(num):
+    if num is None: return "N/A"
+    num = abs(num)
+    if num >= 1_000_000_000: return f"${num/1_000_000_000:.1f}B"
+    elif num >= 1_000_000: return f"${num/1_000_000:.1f}M"
+    elif num >= 1_000: return f"${num/1_000:.0f}K"
+    else: return f"${num:.0f}"
+
+def get_metric_status(value, is_reit, metric_type):
+    if value is None: return None, "off"
+    if metric_type == 'payout':
+        limit_good = 90 if is_reit else 75; limit_bad = 100 if is_reit else 90
+        if value < limit_good: return "Safe", "normal"
+        elif value > limit_bad: return "High", "inverse"
+        else: return "OK", "off"
+    elif metric_type == 'net_debt_ebitda':
+        limit_good = 6.0 if is_reit else 3.0; limit_bad = 7.5 if is_reit else 4.5
+        if value < limit_good: return "Safe", "normal"
+        elif value > limit_bad: return "High Debt", "inverse"
+        else: return "Elevated", "off"
+    elif metric_type == 'int_cov':
+        if value > 3.0: return "Safe", "normal"
+        elif value < 1.5: return "Critical", "inverse"
+        else: return "Tight", "off"
+    elif metric_type == 'roe' or metric_type == 'roic' or metric_type == 'profit_margin':
+        limit_good = 12 if metric_type == 'roe' else 8
+        if metric_type == 'profit_margin': limit_good = 10
+        if value > limit_good: return "Good", "normal"
+        elif value < 5: return "Low", "inverse"
+        else: return "Average", "off"
+    elif metric_type == 'chowder':
+        limit_good = 8 if is_reit else 12
+        if value > limit_good: return "Attractive", "normal"
+        else: return "Low Growth", "off"
+    elif metric_type == 'gross_margin':
+        if value > 40: return "High", "normal"
+        elif value < 20: return "Low", "inverse"
+        else: return "Average", "off"
+    elif metric_type == 'beta':
+        if value < 0.8: return "Defensive", "normal"
+        elif value > 1.3: return "Volatile", "inverse"
+        else: return "Market", "off"
+    return None, "off"
+
+def calculate_altman_z(bal_lines, fin_lines, info):
+    try:
+        z = altman_z_panel([{'balance': bal_lines, 'financials': fin_lines}], [safe_get(info, 'marketCap', 0)])
+        z_score, year = (s.iloc[0] for s in latest_valid(z))
+        return (None, None) if pd.isna(z_score) else (z_score, int(year))
+    except: return None, None
+
+def calculate_fair_value(eps, growth_rate, pe_ratio):
+    try:
+        lynch_value = 0
+        if growth_rate > 0 and eps > 0:
+            lynch_value = eps * (growth_rate if growth_rate < 25 else 25) 
+        graham_value = 0
+        if eps > 0 and growth_rate > 0:
+             graham_value = eps * (7 + 1.5 * growth_rate)
+        return lynch_value, graham_value
+    except: return 0, 0
+
+# --- BATCH SCORING (N empresas x M anos) ---
+# Kernels NumPy sem exceções: inputs em falta dão NaN em vez de abortar a empresa inteira.
+ALTMAN_LINES = (
+    ('balance', 'total_assets'), ('balance', 'total_liabilities'), ('balance', 'current_assets'),
+    ('balance', 'current_liabilities'), ('balance', 'retained_earnings'), ('financials', 'ebit'), ('financials', 'revenue'),
+)
+
+def panel_years(lines_list):
+    years = set()
+    for lines in lines_list:
+        for statement, metric in ALTMAN_LINES:
+            series = lines.get(statement, {}).get(metric)
+            if series is not None: years.update(series.index.year)
+    return sorted(years)
+
+def statement_panel(lines_list, statement, metric, years):
+    by_company = {}
+    for i, lines in enumerate(lines_list):
+        series = lines.get(statement, {}).get(metric)
+        if series is not None and not series.empty: by_company[i] = series.groupby(series.index.year).sum(min_count=1)
+    panel = pd.DataFrame(by_company).T if by_company else pd.DataFrame()
+    return panel.reindex(index=range(len(lines_list)), columns=years)
+
+def altman_z_batch(total_assets, total_liab, current_assets, current_liab, retained_earnings, ebit, revenue, market_cap):
+    ta, tl, ca, cl, re, ebit, rev = (np.asarray(x, dtype=float) for x in
+                                     (total_assets, total_liab, current_assets, current_liab, retained_earnings, ebit, revenue))
+    mc = np.asarray(market_cap, dtype=float)
+    if mc.ndim == 1: mc = mc[:, None]
+    valid = np.isfinite(ta) & np.isfinite(tl) & np.isfinite(ca) & np.isfinite(cl) & np.isfinite(re) & np.isfinite(ebit) & np.isfinite(rev)
+    valid &= np.isfinite(mc) & (ta != 0) & (tl != 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (1.2 * (ca - cl) + 1.4 * re + 3.3 * ebit + 1.0 * rev) / ta + 0.6 * mc / tl
+    return np.where(valid, z, np.nan)
+
+def altman_z_panel(lines_list, market_caps, years=None):
+    if years is None: years = panel_years(lines_list)
+    inputs = [statement_panel(lines_list, statement, metric, years).to_numpy(dtype=float) for statement, metric in ALTMAN_LINES]
+    return pd.DataFrame(altman_z_batch(*inputs, market_caps), columns=years)
+
+# Último valor não-NaN de cada linha e o ano fiscal de onde veio (um ano antigo tem de ser mostrado como tal)
+def latest_valid(panel):
+    if panel.shape[1] == 0: return pd.Series(np.nan, index=panel.index), pd.Series(np.nan, index=panel.index)
+    values = panel.to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    last = values.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    found = valid.any(axis=1)
+    latest = np.where(found, values[np.arange(len(values)), last], np.nan)
+    years = np.where(found, np.asarray(panel.columns, dtype=float)[last], np.nan)
+    return pd.Series(latest, index=panel.index), pd.Series(years, index=panel.index)
+
+def fair_value_batch(eps, growth_rate):
+    eps = np.asarray(eps, dtype=float); g = np.asarray(growth_rate, dtype=float)
+    known = np.isfinite(eps) & np.isfinite(g)
+    ok = known & (eps > 0) & (g > 0)
+    lynch = np.where(ok, eps * np.minimum(g, 25), np.where(known, 0.0, np.nan))
+    graham = np.where(ok, eps * (7 + 1.5 * g), np.where(known, 0.0, np.nan))
+    return lynch, graham
+
+def growth_estimate(info):
+    growth_est = safe_get(info, 'earningsGrowth', 0.05) * 100 
+    return 5 if growth_est < 0 else growth_est
+
+# --- METRICS ENGINE ---
+# Motor puro (sem Streamlit): recebe o bundle do market_data e devolve um dict com todas as métricas.
+# As séries anuais são alinhadas numa única tabela e os rácios são calculados para todos os anos de uma vez.
+ANNUAL_LINES = {
+    'NI': [('cashflow', 'net_income'), ('financials', 'net_income')],
+    'DEPR': [('cashflow', 'depreciation'), ('financials', 'depreciation')],
+    'CAPEX': [('cashflow', 'capex')],
+    'SHARES': [('balance', 'shares_issued'), ('financials', 'avg_shares')],
+    'OCF': [('cashflow', 'operating_cash_flow')],
+    'FCF': [('cashflow', 'free_cash_flow')],
+    'DIVS_PAID': [('cashflow', 'dividends_paid')],
+    'EPS': [('financials', 'eps')],
+    'DEBT': [('balance', 'total_debt')],
+    'GP': [('financials', 'gross_profit')],
+    'REV': [('financials', 'revenue')],
+    'CASH': [('balance', 'cash')],
+    'EBITDA': [('financials', 'ebitda')],
+    'EBIT': [('financials', 'ebit')],
+    'INT': [('financials', 'interest_expense')],
+    'EQUITY': [('balance', 'total_equity')],
+    'SGA': [('financials', 'sga')],
+}
+
+def pick_lines(lines):
+    picked = {}
+    for col, sources in ANNUAL_LINES.items():
+        for statement, metric in sources:
+            series = lines.get(statement, {}).get(metric)
+            if series is not None: picked[col] = series; break
+    return picked
+
+def _latest(series, default=0):
+    if series is None or series.empty: return default
+    val = series.iloc[-1]
+    return default if pd.isna(val) else val
+
+def _insider_summary(insider_tx):
+    insider_label = "Neutral"; insider_val_str = "N/A"; insider_delta_display = "No Data"; net_val_insider = 0
+    summary = insiders.summarize(insider_tx)
+    if insider_tx is not None and not insider_tx.empty:
+        headline = summary['windows'].loc[insiders.HEADLINE_WINDOW]
+        net_val_insider = float(headline['Net $'])
+        if net_val_insider > 0: insider_label = "Net Buying"; insider_val_str = format_large_number(net_val_insider)
+        elif net_val_insider < 0: insider_label = "Net Selling"; insider_val_str = format_large_number(net_val_insider).replace("-", "")
+        insider_delta_display = f"{int(headline['Buys'])} Buys / {int(headline['Sells'])} Sells ({insiders.HEADLINE_WINDOW})"
+    return {'insider_label': insider_label, 'insider_val_str': insider_val_str, 'insider_delta_display': insider_delta_display,
+            'insider_net_value': net_val_insider, 'insider_windows': summary['windows'], 'insider_roles': summary['roles']}
+
+def compute_metrics(bundle):
+    info = bundle.get('info') or {}
+    fast_info = bundle.get('fast_info') or {}
+    hist_price = bundle['history']
+    divs = bundle['dividends']
+    lines = bundle.get('lines', {})
+    raw = pick_lines(lines)
+    annual = align_annual_data(raw)
+    has = lambda *cols: all(c in annual.columns for c in cols)
+    # Séries TTM trimestrais (do store via load_bundle, ou calculadas aqui para bundles sem elas)
+    ttm = bundle.get('ttm')
+    if ttm is None: ttm = quarterly.compute(quarterly.quarters(lines))
+    ttm_now = quarterly.latest(ttm)
+    m = {'lines': raw, 'annual': annual, 'ttm': ttm, 'ttm_now': ttm_now}
+
+    # Price & Cap
+    price_curr = fast_info.get('last_price')
+    if not price_curr: price_curr = safe_get(info, 'currentPrice')
+    if not price_curr and not hist_price.empty: price_curr = hist_price['Close'].iloc[-1]
+    if price_curr is None: price_curr = 0.0
+    mkt_cap = fast_info.get('market_cap')
+    if not mkt_cap: mkt_cap = safe_get(info, 'marketCap')
+
+    # Type Detection
+    sector = str(info.get('sector', '')).lower()
+    industry = str(info.get('industry', '')).lower()
+    is_reit = 'reit' in sector or 'reit' in industry or 'real estate' in sector
+    div_yield_check = safe_get(info, 'dividendRate')
+    has_dividends = bool((div_yield_check and div_yield_check > 0) or (not divs.empty and divs.sum() > 0))
+
+    # Cash Flow Logic (AFFO/FCF por ação)
+    series_affo_share = None
+    df_calc = annual.reindex(columns=['NI', 'DEPR', 'CAPEX', 'SHARES', 'OCF']).dropna(how='all')
+    if not df_calc.empty:
+        ni, depr, capex, ocf = (df_calc[c].fillna(0) for c in ['NI', 'DEPR', 'CAPEX', 'OCF'])
+        if is_reit: cash_metric = df_calc['OCF'] if ocf.sum() != 0 else ni + depr
+        else: cash_metric = ocf + capex
+        if has('SHARES'): series_affo_share = cash_metric / df_calc['SHARES'].replace(0, 1)
+
+    series_gross_margin = None
+    if has('GP', 'REV'): series_gross_margin = (annual['GP'] / annual['REV'] * 100).dropna()
+
+    ebitda = annual['EBITDA'] if has('EBITDA') else annual['NI'] + annual['DEPR'] if has('NI', 'DEPR') else None
+    nd_ebitda_val = 0
+    if ebitda is not None and has('DEBT', 'CASH'):
+        nd_ebitda_val = _latest((annual['DEBT'] - annual['CASH']) / ebitda.where(ebitda > 0))
+    nd_ebitda_val = _current(ttm_now, 'ND/EBITDA', nd_ebitda_val)
+
+    int_cov_val = 0
+    if has('EBIT', 'INT'):
+        int_abs = annual['INT'].abs()
+        int_cov_val = _latest(annual['EBIT'] / int_abs.where(int_abs > 0))
+    int_cov_val = _current(ttm_now, 'Int Cov', int_cov_val)
+
+    # ROIC (série anual; valor atual TTM, ou do último ano)
+    roic_val = 0; avg_roic = 0; roic_trend = "Stable"; series_roic = None
+    if has('EBIT', 'EQUITY', 'DEBT'):
+        cash_bal = annual['CASH'].fillna(0) if has('CASH') else 0
+        inv_cap = annual['EQUITY'] + annual['DEBT'] - cash_bal
+        roic_all = annual['EBIT'] / inv_cap.where(inv_cap > 0) * 100
+        roic_val = _latest(roic_all)
+        series_roic = roic_all.dropna()
+        recent_roic = series_roic.tail(5)
+        if not recent_roic.empty: avg_roic = recent_roic.mean()
+        if len(recent_roic) > 2:
+            if recent_roic.iloc[-1] > recent_roic.mean() * 1.1: roic_trend = "Rising ↗"
+            elif recent_roic.iloc[-1] < recent_roic.mean() * 0.9: roic_trend = "Falling ↘"
+    roic_val = _current(ttm_now, 'ROIC%', roic_val)
+    roe_val = safe_get(info, 'returnOnEquity')*100
+
+    pe_ratio = safe_get(info, 'trailingPE')
+    if not pe_ratio and price_curr: 
+         eps_ttm = safe_get(info, 'trailingEps') or ttm_now.get('EPS_TTM')
+         if eps_ttm and eps_ttm > 0: pe_ratio = price_curr / eps_ttm
+
+    # --- ALTMAN Z ---
+    z_score_val, z_year = calculate_altman_z(lines.get('balance', {}), lines.get('financials', {}), info)
+    # Série histórica: market cap de cada ano = ações x fecho do ano (senão o market cap atual)
+    z_years = panel_years([lines])
+    year_caps = pd.Series(float(mkt_cap or 0), index=z_years)
+    if has('SHARES') and not hist_price.empty:
+        year_close = hist_price['Close'].groupby(hist_price.index.year).last()
+        year_caps = (annual['SHARES'] * year_close).reindex(z_years).fillna(year_caps)
+    series_z_score = altman_z_panel([lines], year_caps.to_numpy()[None, :], z_years).iloc[0].dropna()
+    z_score_txt = "N/A"; z_color = "off"
+    if z_score_val is not None and not is_reit and 'financial' not in sector:
+        z_score_txt = f"{round(z_score_val, 2)} (FY{z_year})"
+        if z_score_val > 3.0: z_color = "normal" 
+        elif z_score_val < 1.8: z_color = "inverse"
+    elif is_reit or 'financial' in sector:
+        z_score_txt = "N/A (Setor)"
+
+    # --- DIVIDENDS & PAYOUT ---
+    cagr_3, cagr_5 = 0, 0
+    fcf_payout_ratio = None
+    series_divs_history = None
+    div_engine = dividends.analyze(divs, hist_price['Close']) if has_dividends and not hist_price.empty else None
+    if has_dividends and not divs.empty:
+        series_divs_history = divs.resample('YE').sum()
+        # CAGR sobre o TTM em cada ex-date: um ano corrente ainda parcial já não distorce o valor
+        if div_engine: cagr_3, cagr_5 = div_engine['cagr'][3], div_engine['cagr'][5]
+        
+        if is_reit:
+            ttm_ocf = safe_get(info, 'operatingCashflow')
+            if ttm_ocf and ttm_ocf > 0:
+                div_rate = safe_get(info, 'dividendRate')
+                shares = safe_get(info, 'sharesOutstanding')
+                if div_rate and shares:
+                    total_div_est = div_rate * shares
+                    fcf_payout_ratio = (total_div_est / ttm_ocf) * 100
+        
+        if fcf_payout_ratio is None:
+            # OCF (REIT) ou FCF dos 4 trimestres mais recentes
+            manual_cash_metric = ttm_now.get('OCF_TTM' if is_reit else 'FCF_TTM', 0)
+            div_rate = safe_get(info, 'dividendRate')
+            shares = safe_get(info, 'sharesOutstanding')
+            if manual_cash_metric > 0 and div_rate > 0 and shares > 0:
+                total_div_est = div_rate * shares
+                fcf_payout_ratio = (total_div_est / manual_cash_metric) * 100
+
+    # Yield forward diária (ex-dates x preço de fecho) e banda de percentis dos últimos 5 anos
+    series_yield_history = None
+    avg_yield_5y = 0
+    yield_band = None
+    if div_engine:
+        series_yield_history = div_engine['forward_yield']
+        yield_band = div_engine['band']
+        if yield_band: avg_yield_5y = yield_band['mean']
+
+    # --- TOP METRICS (Yield & Payout) ---
+    div_yield_val = 0.0; final_payout_val = 0.0; final_payout_label = None
+    if has_dividends:
+        div_rate_val = safe_get(info, 'dividendRate')
+        if price_curr > 0: div_yield_val = (div_rate_val / price_curr * 100)
+        final_payout_label = "Payout (FCF)"
+        if fcf_payout_ratio is not None and 0 < fcf_payout_ratio < 500:
+            final_payout_val = fcf_payout_ratio
+            if is_reit: final_payout_label = "Payout (FFO)"
+        else:
+            if not is_reit:
+                final_payout_val = safe_get(info, 'payoutRatio') * 100
+                final_payout_label = "Payout (GAAP)"
+            else: final_payout_val = 0; final_payout_label = "Payout (N/A)"
+
+    # --- MOAT CALCULATION (ADVANCED) ---
+    avg_gm = 0
+    if series_gross_margin is not None and not series_gross_margin.empty:
+        avg_gm = series_gross_margin.tail(5).mean()
+    
+    buffett_score_txt = "N/A"; buffett_class = "moat-avg"
+    if has('SGA', 'GP'):
+        sga_ratio = _latest(annual['SGA'] / annual['GP'].where(annual['GP'] > 0) * 100, None)
+        if sga_ratio is not None:
+            if sga_ratio < 30: buffett_score_txt = f"Great ({round(sga_ratio)}%)"; buffett_class = "moat-good"
+            elif sga_ratio < 70: buffett_score_txt = f"Good ({round(sga_ratio)}%)"; buffett_class = "moat-avg"
+            else: buffett_score_txt = f"High ({round(sga_ratio)}%)"; buffett_class = "moat-bad"
+
+    moat_data = []
+    if is_reit:
+        if avg_gm > 60: moat_data.append(("GM (5Y)", f"{round(avg_gm,1)}%", "moat-good"))
+        elif avg_gm > 40: moat_data.append(("GM (5Y)", f"{round(avg_gm,1)}%", "moat-avg"))
+        else: moat_data.append(("GM (5Y)", f"{round(avg_gm,1)}%", "moat-bad"))
+    else:
+        c_roic = "moat-bad"
+        if avg_roic > 15: c_roic = "moat-good"
+        elif avg_roic > 9: c_roic = "moat-avg"
+        moat_data.append(("ROIC (5Y)", f"{round(avg_roic, 1)}%", c_roic))
+
+    moat_data.append(("Op. Eff (SG&A)", buffett_score_txt, buffett_class))
+    
+    if nd_ebitda_val < 2.5 and nd_ebitda_val > 0: moat_data.append(("Leverage", "Low Debt", "moat-good"))
+    elif nd_ebitda_val < 4.5: moat_data.append(("Leverage", "Moderate", "moat-avg"))
+    else: moat_data.append(("Leverage", "High Debt", "moat-bad"))
+
+    if mkt_cap > 100000000000: moat_data.append(("Scale", "Dominant", "moat-good"))
+    elif mkt_cap > 20000000000: moat_data.append(("Scale", "Large", "moat-avg"))
+    else: moat_data.append(("Scale", "Small", "moat-bad"))
+
+    good_count = sum(1 for x in moat_data if x[2] == 'moat-good')
+    avg_count = sum(1 for x in moat_data if x[2] == 'moat-avg')
+    total_score = (good_count * 2) + (avg_count * 1) 
+    moat_verdict = "No Moat 🛡️"
+    if total_score >= 6: moat_verdict = "Wide Moat 🏰"
+    elif total_score >= 3: moat_verdict = "Narrow Moat 🏠"
+
+    # --- FAIR VALUE ---
+    # Solvência (gráfico cash flow vs dívida), alinhado uma vez por bundle
+    debt_safety = pd.DataFrame()
+    cash_line = raw.get('OCF') if is_reit else raw.get('FCF')
+    if cash_line is not None and raw.get('DEBT') is not None:
+        debt_safety = align_annual_data({'Cash Flow': cash_line, 'Total Debt': raw['DEBT']})
+
+    lynch_v, graham_v = calculate_fair_value(safe_get(info, 'trailingEps'), growth_estimate(info), safe_get(info, 'trailingPE'))
+
+    m.update({
+        'price': price_curr, 'market_cap': mkt_cap, 'sector': sector, 'is_reit': is_reit, 'has_dividends': has_dividends,
+        'series_affo_share': series_affo_share, 'series_gross_margin': series_gross_margin, 'series_roic': series_roic,
+        'debt_safety': debt_safety, 'nd_ebitda': nd_ebitda_val, 'int_cov': int_cov_val, 'roic': roic_val, 'roe': roe_val,
+        'pe_ratio': pe_ratio, 'beta': safe_get(info, 'beta'),
+        'z_score': z_score_val, 'z_year': z_year, 'series_z_score': series_z_score, 'z_score_txt': z_score_txt, 'z_color': z_color,
+        'cagr_3': cagr_3, 'cagr_5': cagr_5, 'series_divs_history': series_divs_history, 'fcf_payout_ratio': fcf_payout_ratio,
+        'series_yield_history': series_yield_history, 'avg_yield_5y': avg_yield_5y, 'yield_band': yield_band,
+        'div_streak': div_engine['streak'] if div_engine else 0, 'div_last_cut': div_engine['last_cut'] if div_engine else None,
+        'div_ttm': div_engine['ttm'] if div_engine else None,
+        'div_yield': div_yield_val, 'payout': final_payout_val, 'payout_label': final_payout_label,
+        'moat_data': moat_data, 'roic_trend': roic_trend, 'total_score': total_score, 'moat_verdict': moat_verdict,
+        'lynch_value': lynch_v, 'graham_value': graham_v, 'chowder': div_yield_val + cagr_5,
+    })
+    m.update(_insider_summary(bundle.get('insider')))
+    return m
@@ -0,0 +1,92 @@
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import data_store
+import outbound
+import telemetry
+
+# --- NEWS FEED ---
+# Cache (ticker, lang) no store com TTL; quando expira, o pedido é condicional (ETag / Last-Modified)
+# e um 304 só renova o timestamp. O RSS é lido em streaming e o parse pára ao 5º <item>.
+NEWS_TTL = 10 * data_store.MINUTE
+MAX_ITEMS = 5
+TIMEOUT = 4
+CHUNK_SIZE = 8192
+RETRY_AFTER = 60
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="news")
+_inflight = {}
+_inflight_lock = threading.Lock()
+_failed_at = {}
+
+def _dataset(lang):
+    return f"news_{lang}"
+
+def _url(ticker, lang):
+    return f"https://news.google.com/rss/search?q={ticker}+stock+finance&hl={lang}&gl=US&ceid=US:{lang}"
+
+def _text(item, tag, default):
+    node = item.find(tag)
+    return node.text if node is not None and node.text else default
+
+def parse_items(chunks, limit=MAX_ITEMS):
+    parser = ET.XMLPullParser(events=("end",))
+    items = []
+    for chunk in chunks:
+        parser.feed(chunk)
+        for _, elem in parser.read_events():
+            if elem.tag != "item": continue
+            pub_date = _text(elem, "pubDate", "")
+            items.append({'title': _text(elem, "title", "No Title"), 'link': _text(elem, "link", "#"),
+                          'date': pub_date[:16] if len(pub_date) > 16 else pub_date})
+            elem.clear()
+            if len(items) >= limit: return items
+    return items
+
+def _fetch(ticker, lang):
+    cached = data_store.load(ticker, _dataset(lang), max_age=float('inf'))
+    headers = dict(HEADERS)
+    if cached:
+        if cached.get('etag'): headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'): headers['If-Modified-Since'] = cached['last_modified']
+    return outbound.request("google_news", f"{ticker}:{lang}", lambda: _get(ticker, lang, headers, cached))
+
+def _get(ticker, lang, headers, cached):
+    with telemetry.timed("http", "google_news", ticker=ticker, lang=lang):
+        with requests.get(_url(ticker, lang), headers=headers, timeout=TIMEOUT, stream=True) as response:
+            if response.status_code == 304 and cached:
+                telemetry.count("news", result="not_modified")
+                return cached
+            response.raise_for_status()
+            return {'items': parse_items(response.iter_content(CHUNK_SIZE)),
+                    'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified')}
+
+def _fetch_safe(ticker, lang):
+    key = (ticker, lang)
+    # Entre réplicas só uma vai à Google; a gravação no store (também num 304) renova o TTL
+    try: return data_store.fetch_shared(ticker, _dataset(lang), lambda: _fetch(ticker, lang), max_age=NEWS_TTL)['items']
+    except Exception:
+        _failed_at[key] = time.monotonic()
+        return []
+    finally:
+        with _inflight_lock: _inflight.pop(key, None)
+
+# (headlines, pending) sem bloquear: com a cache expirada o download corre em fundo
+# e entretanto devolve-se a versão antiga (ou None)
+def request_news(ticker, lang):
+    fresh = data_store.load(ticker, _dataset(lang), max_age=NEWS_TTL)
+    if fresh is not None: return fresh['items'], False
+    key = (ticker, lang)
+    stale = data_store.load(ticker, _dataset(lang), max_age=float('inf'))
+    stale_items = stale['items'] if stale else None
+    with _inflight_lock:
+        if key in _inflight: return stale_items, True
+        # Depois de uma falha, espera RETRY_AFTER antes de voltar a tentar
+        if time.monotonic() - _failed_at.get(key, float('-inf')) < RETRY_AFTER: return stale_items or [], False
+        _inflight[key] = _executor.submit(_fetch_safe, ticker, lang)
+    return stale_items, True
@@ -0,0 +1,165 @@
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+import telemetry
+
+# --- OUTBOUND REQUEST SCHEDULER ---
+# Todos os pedidos externos passam por request(): um único pedido em curso por chave (as outras
+# sessões esperam pelo mesmo resultado), token bucket por host, retentativas com backoff exponencial
+# e jitter, e um circuit breaker por host que corta os pedidos enquanto o upstream está a falhar.
+# Os limites são por processo: com N réplicas o débito total para o host é N vezes maior.
+RATE_LIMITS = {  # (pedidos por segundo, rajada)
+    "yahoo": (5.0, 10),
+    "google_news": (2.0, 4),
+    "nasdaqtrader": (0.2, 1),
+}
+DEFAULT_RATE = (2.0, 4)
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+# Tempo máximo à espera de um token antes de desistir do pedido (por omissão; ver request())
+MAX_QUEUE_WAIT = 10.0
+# Falhas seguidas que abrem o circuito e tempo até deixar passar um pedido de teste (half-open)
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30.0
+
+class CircuitOpen(Exception):
+    pass
+
+class _Bucket:
+    def __init__(self, rate, capacity):
+        self.rate, self.capacity = rate, capacity
+        self.tokens, self.updated = float(capacity), time.monotonic()
+        self.lock = threading.Lock()
+
+    # Reserva o próximo token e devolve quanto tempo esperar por ele
+    def reserve(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    def refund(self):
+        with self.lock: self.tokens = min(self.capacity, self.tokens + 1)
+
+class _Breaker:
+    def __init__(self):
+        self.failures, self.opened_at, self.probing = 0, None, False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None: return True
+            # Half-open: um único pedido de teste depois do cooldown
+            if self.probing or time.monotonic() - self.opened_at < BREAKER_COOLDOWN: return False
+            self.probing = True
+            return True
+
+    def success(self):
+        with self.lock: self.failures, self.opened_at, self.probing = 0, None, False
+
+    # O pedido de teste não chegou ao upstream (ex.: fila cheia): o próximo pedido volta a testar
+    def abandon(self):
+        with self.lock: self.probing = False
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= BREAKER_THRESHOLD:
+                opened = self.opened_at is None
+                self.opened_at, self.probing = time.monotonic(), False
+                return opened
+            return False
+
+    def state(self):
+        with self.lock:
+            if self.opened_at is None: return "closed"
+            return "half_open" if self.probing or time.monotonic() - self.opened_at >= BREAKER_COOLDOWN else "open"
+
+_buckets, _breakers = {}, {}
+_state_lock = threading.Lock()
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def _host_state(host):
+    with _state_lock:
+        if host not in _buckets:
+            _buckets[host] = _Bucket(*RATE_LIMITS.get(host, DEFAULT_RATE))
+            _breakers[host] = _Breaker()
+        return _buckets[host], _breakers[host]
+
+def _status_code(exc):
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None)
+
+# 4xx (exceto 429) é um problema do pedido, não do upstream: nem se repete nem conta para o breaker
+def _client_error(exc):
+    status = _status_code(exc)
+    return status is not None and 400 <= status < 500 and status != 429
+
+def _backoff(attempt, exc):
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+    retry_after = getattr(getattr(exc, "response", None), "headers", {}).get("Retry-After", "")
+    if str(retry_after).isdigit(): delay = max(delay, min(BACKOFF_CAP, float(retry_after)))
+    return delay
+
+def _run(host, fn, attempts, max_wait):
+    bucket, breaker = _host_state(host)
+    for attempt in range(attempts):
+        if not breaker.allow():
+            telemetry.count("outbound", host=host, result="circuit_open")
+            raise CircuitOpen(f"{host} circuit open")
+        wait = bucket.reserve()
+        if wait > max_wait:
+            bucket.refund()
+            breaker.abandon()
+            telemetry.count("outbound", host=host, result="rate_limited")
+            raise TimeoutError(f"{host} rate limit queue full")
+        if wait > 0:
+            telemetry.count("outbound", host=host, result="rate_wait")
+            time.sleep(wait)
+        try: result = fn()
+        except Exception as exc:
+            if _client_error(exc):
+                breaker.success()
+                raise
+            if breaker.failure(): telemetry.count("outbound", host=host, result="circuit_opened")
+            if attempt == attempts - 1: raise
+            telemetry.count("outbound", host=host, result="retry")
+            time.sleep(_backoff(attempt, exc))
+        else:
+            breaker.success()
+            return result
+
+# Executa fn() para `key` no host; pedidos concorrentes com a mesma chave partilham o resultado
+# (ou a exceção) do primeiro em vez de irem também ao upstream. Pedidos em fundo (lotes) podem
+# aceitar uma fila mais longa com `max_wait`, que é também o máximo que quem partilha espera pelo resultado.
+def request(host, key, fn, attempts=MAX_ATTEMPTS, max_wait=MAX_QUEUE_WAIT):
+    with _inflight_lock:
+        future = _inflight.get((host, key))
+        leader = future is None
+        if leader: future = _inflight[(host, key)] = Future()
+    if not leader:
+        telemetry.count("outbound", host=host, result="coalesced")
+        try: return future.result(timeout=max_wait)
+        except TimeoutError:
+            if future.done(): raise
+            telemetry.count("outbound", host=host, result="coalesced_timeout")
+            raise TimeoutError(f"{host} request {key} still in flight after {max_wait}s") from None
+    try:
+        result = _run(host, fn, attempts, max_wait)
+        future.set_result(result)
+        return result
+    except BaseException as exc:
+        future.set_exception(exc)
+        raise
+    finally:
+        with _inflight_lock: _inflight.pop((host, key), None)
+
+def status():
+    with _state_lock: hosts = dict(_breakers)
+    return {host: {"circuit": breaker.state(), "failures": breaker.failures} for host, breaker in hosts.items()}
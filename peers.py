@@ -0,0 +1,93 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import yfinance as yf
+
+import data_store
+import outbound
+import telemetry
+
+# --- PEER COMPARISON ENGINE ---
+# Uma cotação em bloco para todos os símbolos + .info em paralelo; cada snapshot fica no store com TTL.
+PEER_COLUMNS = {"Price": "float64", "P/E": "float64", "Yield%": "float64", "Payout%": "float64", "Debt/Eq": "float64"}
+MAX_INFO_WORKERS = 8
+
+def _num(info, key):
+    val = info.get(key) if isinstance(info, dict) else None
+    return val if isinstance(val, (int, float)) else 0
+
+def _download(tickers):
+    with telemetry.timed("yahoo", "download", tickers=len(tickers)):
+        return yf.download(tickers, period="5d", progress=False, auto_adjust=False, group_by="column")
+
+def _bulk_last_prices(tickers):
+    try:
+        data = outbound.request("yahoo", "download:" + ",".join(sorted(tickers)), lambda: _download(tickers))
+        close = data["Close"]
+        if isinstance(close, pd.Series): close = close.to_frame(tickers[0])
+        last = close.ffill().iloc[-1]
+        return {t: float(v) for t, v in last.items() if pd.notna(v)}
+    except Exception: return {}
+
+def _info(ticker):
+    with telemetry.timed("yahoo", "info", ticker=ticker): return yf.Ticker(ticker).info
+
+# Mesma chave que market_data: se a página do ticker estiver a pedir o .info, espera-se por esse.
+# None se o pedido falhar (distinto de um .info vazio)
+def _safe_info(ticker):
+    try: return outbound.request("yahoo", f"info:{ticker}", lambda: _info(ticker))
+    except Exception: return None
+
+def _snapshot(ticker, info, price):
+    if not price: price = _num(info, 'currentPrice')
+    if not price: return None
+    return {
+        "Ticker": ticker, "Price": round(price, 2), "P/E": round(_num(info, 'trailingPE'), 1),
+        "Yield%": round(_num(info, 'dividendYield') * 100, 2), "Payout%": round(_num(info, 'payoutRatio') * 100, 1),
+        "Debt/Eq": round(_num(info, 'debtToEquity'), 1),
+    }
+
+def _fetch_snapshots(tickers):
+    if not tickers: return {}
+    prices = _bulk_last_prices(tickers)
+    with ThreadPoolExecutor(max_workers=min(MAX_INFO_WORKERS, len(tickers))) as pool:
+        infos = dict(zip(tickers, pool.map(_safe_info, tickers)))
+    snapshots = {}
+    for t in tickers:
+        snap = _snapshot(t, infos[t] or {}, prices.get(t))
+        # Só se grava um snapshot com o .info descarregado (sem ele P/E, yield, payout e dívida seriam 0)
+        if snap is not None and infos[t] is not None: data_store.save(t, "peer_snapshot", snap)
+        else:
+            # Yahoo a falhar: fica a última linha conhecida deste símbolo (com o preço atual, se houver)
+            stale = data_store.load(t, "peer_snapshot", max_age=float('inf'))
+            if stale is not None:
+                telemetry.count("stale_fallback", dataset="peer_snapshot", ticker=t)
+                snap = {**stale, "Price": snap["Price"]} if snap is not None else stale
+            elif snap is not None: snap = {**snap, **{col: float('nan') for col in PEER_COLUMNS if col != "Price"}}
+            else: continue
+        snapshots[t] = snap
+    return snapshots
+
+def fetch_peer_table(tickers):
+    tickers = list(dict.fromkeys(tickers))
+    snapshots, pending = {}, []
+    for t in tickers:
+        cached = data_store.load(t, "peer_snapshot")
+        if cached is not None: snapshots[t] = cached
+        else: pending.append(t)
+
+    # Descarrega em bloco os símbolos cujo lock obtivemos; os que outro worker já está a
+    # descarregar são lidos do store no fim (e descarregados aqui só se esse worker falhar)
+    owned = {t: data_store.acquire(t, "peer_snapshot") for t in pending}
+    try: snapshots.update(_fetch_snapshots([t for t, token in owned.items() if token]))
+    finally:
+        for t, token in owned.items():
+            if token: data_store.release(t, "peer_snapshot", token)
+    waiting = [t for t, token in owned.items() if not token]
+    for t in waiting:
+        snap = data_store.wait_for(t, "peer_snapshot")
+        if snap is not None: snapshots[t] = snap
+    snapshots.update(_fetch_snapshots([t for t in waiting if t not in snapshots]))
+
+    rows = [snapshots[t] for t in tickers if t in snapshots]
+    return pd.DataFrame(rows, columns=["Ticker", *PEER_COLUMNS]).astype(PEER_COLUMNS).set_index("Ticker")
@@ -0,0 +1,105 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import market_data
+import screener
+
+# --- PORTFOLIO / WATCHLIST ---
+# Posições (Shares = 0 -> só watchlist) guardadas num CSV ao lado do store. A atualização carrega todos
+# os bundles em paralelo (reaproveita o scoring do screener); os agregados são operações em coluna sobre
+# as posições, por isso alterar quantidades não volta a descarregar nada.
+PORTFOLIO_PATH = os.environ.get(
+    "DASHBOARD_PORTFOLIO",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "portfolio.csv"),
+)
+MAX_WORKERS = 16
+# Correlação sobre retornos diários do último ano (mínimo de 60 dias em comum por par)
+CORRELATION_DAYS = 252
+CORRELATION_MIN_DAYS = 60
+
+HOLDING_COLUMNS = {"Shares": "float64", "Cost": "float64"}
+
+def clean_holdings(df):
+    if df is None or len(df) == 0: return pd.DataFrame(columns=list(HOLDING_COLUMNS), index=pd.Index([], name="Ticker")).astype(HOLDING_COLUMNS)
+    df = pd.DataFrame(df)
+    if 'Ticker' not in df.columns: df = df.rename_axis('Ticker').reset_index()
+    tickers = df['Ticker'].fillna("").astype(str).str.strip().str.upper()
+    missing = pd.Series(np.nan, index=df.index)
+    out = pd.DataFrame({c: pd.to_numeric(df[c], errors='coerce') if c in df.columns else missing for c in HOLDING_COLUMNS})
+    out['Shares'] = out['Shares'].fillna(0).clip(lower=0)
+    out.index = pd.Index(tickers, name="Ticker")
+    out = out[out.index != ""]
+    return out[~out.index.duplicated(keep='last')].astype(HOLDING_COLUMNS)
+
+def load_holdings(path=PORTFOLIO_PATH):
+    try: return clean_holdings(pd.read_csv(path))
+    except (OSError, ValueError, KeyError): return clean_holdings(None)
+
+def save_holdings(holdings, path=PORTFOLIO_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    clean_holdings(holdings).to_csv(tmp)
+    os.replace(tmp, path)
+
+def _load_position(ticker):
+    try:
+        bundle = market_data.load_bundle(ticker)
+        if bundle is None: return None
+        row, batch_inputs = screener.score_bundle(ticker, bundle)
+        close = bundle['history']['Close']
+        dates = close.index.tz_localize(None) if close.index.tz is not None else close.index
+        return row, batch_inputs, pd.Series(close.to_numpy(dtype=float), index=dates.normalize(), name=ticker), bundle.get('version')
+    except Exception: return None
+
+# Métricas por posição (as mesmas colunas do screener) + fechos diários alinhados por data + versão do
+# bundle de cada ticker (chave das caches que dependem dos preços)
+def refresh(tickers, max_workers=MAX_WORKERS):
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers: return pd.DataFrame(columns=list(screener.SCREENER_COLUMNS)), pd.DataFrame(), {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tickers)), thread_name_prefix="portfolio") as pool:
+        results = [r for r in pool.map(_load_position, tickers) if r is not None]
+    rows, batch_inputs, closes = [r[0] for r in results], [r[1] for r in results], [r[2] for r in results]
+    screener.apply_batch_scores(rows, batch_inputs)
+    positions = pd.DataFrame(rows, columns=["Ticker", *screener.SCREENER_COLUMNS]).astype(screener.SCREENER_COLUMNS).set_index("Ticker")
+    prices = pd.concat([c[~c.index.duplicated(keep='last')] for c in closes], axis=1) if closes else pd.DataFrame()
+    return positions, prices, {r[0]["Ticker"]: r[3] for r in results}
+
+def correlation(prices, days=CORRELATION_DAYS):
+    if prices.shape[1] < 2: return pd.DataFrame()
+    returns = np.log(prices.sort_index().ffill(limit=5)).diff().tail(days)
+    return returns.corr(min_periods=CORRELATION_MIN_DAYS)
+
+def analyze(holdings, positions, prices):
+    holdings = clean_holdings(holdings)
+    table = holdings.join(positions[["Name", "Sector", "Price", "Yield%", "Payout%", "ND/EBITDA", "Debt Status", "Moat Score", "Moat", "Missing"]], how='inner')
+    shares, price, cost = table['Shares'].to_numpy(), table['Price'].to_numpy(), table['Cost'].to_numpy()
+    value = shares * price
+    # Yield / moat em falta (bundle parcial) ficam NaN: essas posições saem dos agregados respetivos
+    yields = table['Yield%'].to_numpy(dtype=float)
+    moat = table['Moat Score'].to_numpy(dtype=float, na_value=np.nan)
+    income = value * yields / 100
+    total = value.sum()
+    yield_base, moat_base = value[~np.isnan(yields)].sum(), value[~np.isnan(moat)].sum()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        table['Value'] = value
+        table['Weight%'] = value / total * 100 if total > 0 else 0.0
+        table['Income'] = income
+        table['Yield on Cost%'] = np.where(cost > 0, income / (shares * cost) * 100, np.nan)
+        table['P/L%'] = np.where(cost > 0, (price / cost - 1) * 100, np.nan)
+    weights = table['Weight%'].to_numpy() / 100
+    sectors = table[table['Value'] > 0].groupby('Sector')['Weight%'].sum().sort_values(ascending=False)
+    summary = {
+        "value": float(total), "positions": int((shares > 0).sum()), "income": float(np.nansum(income)),
+        "weighted_yield": float(np.nansum(income) / yield_base * 100) if yield_base > 0 else 0.0,
+        # Moat ponderado pelo valor (só posições com moat) e índice Herfindahl (1/HHI ~ nº efetivo de posições)
+        "weighted_moat": float(np.nansum(value * moat) / moat_base) if moat_base > 0 else 0.0,
+        "effective_positions": float(1 / np.square(weights).sum()) if total > 0 else 0.0,
+        "incomplete": int((table['Missing'].notna().to_numpy() & (shares > 0)).sum()),
+    }
+    # Só posições com ações (as linhas de watchlist não entram na correlação da carteira)
+    held = [t for t in table.index[shares > 0] if t in prices.columns]
+    return {'positions': table.sort_values('Value', ascending=False), 'summary': summary, 'sectors': sectors,
+            'correlation': correlation(prices[held]) if held else pd.DataFrame()}
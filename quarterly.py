@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+import data_store
+import telemetry
+
+# --- QUARTERLY / TTM PIPELINE ---
+# Demonstrações trimestrais (resultados, balanço, cash flow) -> um frame por trimestre com as colunas
+# canónicas, guardado no store. O Yahoo só devolve os últimos ~5 trimestres: cada atualização junta os
+# trimestres novos aos já guardados, por isso o histórico vai crescendo. As séries TTM são somas móveis
+# de 4 trimestres (fluxos) com o balanço do fim do trimestre, e só são recalculadas a partir do primeiro
+# trimestre que mudou (mais WINDOW - 1 trimestres de contexto).
+WINDOW = 4
+# 10 anos de trimestres guardados por ticker
+MAX_QUARTERS = 40
+
+QUARTER_LINES = {
+    'REV': [('q_financials', 'revenue')],
+    'GP': [('q_financials', 'gross_profit')],
+    'EBIT': [('q_financials', 'ebit')],
+    'EBITDA': [('q_financials', 'ebitda')],
+    'DEPR': [('q_cashflow', 'depreciation'), ('q_financials', 'depreciation')],
+    'NI': [('q_financials', 'net_income'), ('q_cashflow', 'net_income')],
+    'EPS': [('q_financials', 'eps')],
+    'INT': [('q_financials', 'interest_expense')],
+    'OCF': [('q_cashflow', 'operating_cash_flow')],
+    'CAPEX': [('q_cashflow', 'capex')],
+    'DEBT': [('q_balance', 'total_debt')],
+    'CASH': [('q_balance', 'cash')],
+    'EQUITY': [('q_balance', 'total_equity')],
+}
+TTM_COLUMNS = [
+    'EPS_TTM', 'REV_TTM', 'NI_TTM', 'EBIT_TTM', 'EBITDA_TTM', 'OCF_TTM', 'FCF_TTM',
+    'Gross Margin%', 'Operating Margin%', 'Net Margin%', 'FCF Margin%', 'ROIC%', 'ND/EBITDA', 'Int Cov',
+]
+
+def _empty_quarters():
+    return pd.DataFrame(columns=list(QUARTER_LINES), index=pd.PeriodIndex([], freq='Q', name='Quarter'), dtype=float)
+
+# Trimestres seguidos: um trimestre em falta fica a NaN e nenhuma janela TTM o atravessa
+def _regular(df):
+    df = df.dropna(how='all')
+    if df.empty: return _empty_quarters()
+    full = pd.period_range(df.index.min(), df.index.max(), freq='Q', name='Quarter')
+    return df.reindex(index=full, columns=list(QUARTER_LINES)).astype(float).tail(MAX_QUARTERS)
+
+def quarters(lines):
+    cols = {}
+    for col, sources in QUARTER_LINES.items():
+        for statement, metric in sources:
+            series = lines.get(statement, {}).get(metric)
+            if series is None or series.empty: continue
+            cols[col] = pd.to_numeric(series, errors='coerce')
+            break
+    if not cols: return _empty_quarters()
+    # Datas de fecho -> trimestre de calendário (um trimestre repetido fica com a data mais recente)
+    df = pd.DataFrame(cols)
+    df.index = pd.DatetimeIndex(df.index).to_period('Q')
+    return _regular(df[~df.index.duplicated(keep='last')])
+
+# Soma móvel de WINDOW trimestres em todas as colunas de uma vez; um NaN na janela dá NaN
+def _rolling_sum(values):
+    out = np.full(values.shape, np.nan)
+    if len(values) >= WINDOW: out[WINDOW - 1:] = sliding_window_view(values, WINDOW, axis=0).sum(axis=-1)
+    return out
+
+def _ttm(q):
+    col = lambda name: q[name].to_numpy(dtype=float)
+    ebitda = np.where(np.isnan(col('EBITDA')), col('EBIT') + col('DEPR'), col('EBITDA'))
+    flows = np.column_stack([
+        col('EPS'), col('REV'), col('GP'), col('NI'), col('EBIT'), ebitda, col('INT'), col('OCF'),
+        col('OCF') + np.nan_to_num(col('CAPEX')),
+    ])
+    eps, rev, gp, ni, ebit, ebitda_ttm, interest, ocf, fcf = _rolling_sum(flows).T
+    debt, cash = col('DEBT'), col('CASH')
+    inv_cap = col('EQUITY') + debt - np.nan_to_num(cash)
+    positive = lambda x: np.where(x > 0, x, np.nan)
+    rev_pos = positive(rev)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = {
+            'EPS_TTM': eps, 'REV_TTM': rev, 'NI_TTM': ni, 'EBIT_TTM': ebit, 'EBITDA_TTM': ebitda_ttm, 'OCF_TTM': ocf, 'FCF_TTM': fcf,
+            'Gross Margin%': gp / rev_pos * 100, 'Operating Margin%': ebit / rev_pos * 100,
+            'Net Margin%': ni / rev_pos * 100, 'FCF Margin%': fcf / rev_pos * 100,
+            'ROIC%': ebit / positive(inv_cap) * 100, 'ND/EBITDA': (debt - cash) / positive(ebitda_ttm),
+            'Int Cov': ebit / positive(np.abs(interest)),
+        }
+    return pd.DataFrame(out, index=q.index, columns=TTM_COLUMNS)
+
+# Linhas TTM a partir da posição `start`, com as WINDOW - 1 linhas anteriores como contexto
+def _compute(q, start=0):
+    window = q.iloc[max(0, start - (WINDOW - 1)):]
+    return _ttm(window).iloc[len(window) - (len(q) - start):]
+
+def compute(q):
+    if q is None or q.empty: return pd.DataFrame(columns=TTM_COLUMNS, index=_empty_quarters().index, dtype=float)
+    return _compute(q)
+
+def _first_change(old, new):
+    a = old.reindex(index=new.index, columns=new.columns).to_numpy(dtype=float)
+    same = np.isclose(a, new.to_numpy(dtype=float), rtol=1e-9, equal_nan=True).all(axis=1)
+    changed = np.flatnonzero(~same)
+    return int(changed[0]) if len(changed) else len(new)
+
+# Reaproveita as linhas TTM anteriores ao primeiro trimestre novo ou revisto
+def extend(frame, old, q):
+    start = _first_change(old, q)
+    prefix = q.index[:start]
+    if not prefix.isin(frame.index).all():
+        telemetry.count("ttm", result="full")
+        return compute(q)
+    telemetry.count("ttm", result="reuse" if start == len(q) else "extend")
+    if start == len(q): return frame.loc[prefix]
+    return pd.concat([frame.loc[prefix], _compute(q, start)])
+
+def for_ticker(ticker, lines):
+    fetched = quarters(lines)
+    cached = data_store.load(ticker, "ttm", max_age=float('inf'))
+    if cached is None:
+        q, frame = fetched, compute(fetched)
+    else:
+        # Valores acabados de descarregar têm prioridade; os guardados preenchem os trimestres antigos
+        q = _regular(fetched.combine_first(cached['quarters']))
+        if q.equals(cached['quarters']):
+            telemetry.count("ttm", result="reuse")
+            return cached['frame']
+        frame = extend(cached['frame'], cached['quarters'], q)
+    if not q.empty: data_store.save(ticker, "ttm", {'quarters': q, 'frame': frame})
+    return frame
+
+# Último trimestre com os valores TTM (dict vazio sem dados trimestrais)
+def latest(frame):
+    if frame is None or frame.empty: return {}
+    row = frame.iloc[-1]
+    return {'quarter': str(frame.index[-1]), **{col: float(row[col]) for col in TTM_COLUMNS if pd.notna(row[col])}}
@@ -0,0 +1,103 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import market_data
+import metrics
+import portfolio
+import screener
+
+# --- HEADLESS REPORTS ---
+# Mesmo pipeline do dashboard (market_data -> metrics -> scoring do screener) sem Streamlit, num pool de
+# processos: python -m report AAPL KO O --out reports --formats csv,parquet,json
+# Os limites do scheduler (outbound) são por processo: N workers fazem até N vezes mais pedidos por host.
+FORMATS = ("csv", "parquet", "json")
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+REPORT_COLUMNS = {
+    **screener.SCREENER_COLUMNS,
+    "Market Cap": "float64", "P/E": "float64", "Div CAGR 5Y%": "float64", "Div Streak": "int64",
+    "Yield 5Y Pctl": "float64", "Chowder": "float64",
+}
+
+def analyze_ticker(ticker):
+    bundle = market_data.load_bundle(ticker)
+    if bundle is None: return None
+    m = metrics.compute_metrics(bundle)
+    row, batch_inputs = screener.score_bundle(ticker, bundle, m)
+    band = m['yield_band'] or {}
+    row.update({
+        "Market Cap": m['market_cap'] or float('nan'), "P/E": m['pe_ratio'] or float('nan'),
+        "Div CAGR 5Y%": m['cagr_5'], "Div Streak": m['div_streak'], "Yield 5Y Pctl": band.get('percentile', float('nan')),
+        "Chowder": m['chowder'],
+    })
+    return row, batch_inputs
+
+def _safe_analyze(ticker):
+    try: return ticker, analyze_ticker(ticker), None
+    except Exception as exc: return ticker, None, f"{type(exc).__name__}: {exc}"
+
+# spawn: cada worker começa limpo (sem threads nem ligações herdadas do processo pai)
+def build_report(tickers, workers=DEFAULT_WORKERS, progress=None):
+    rows, batch_inputs, failed = [], [], {}
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [pool.submit(_safe_analyze, t) for t in tickers]
+        for done, future in enumerate(as_completed(futures), 1):
+            ticker, result, error = future.result()
+            if result is None: failed[ticker] = error or "no price history"
+            else: rows.append(result[0]); batch_inputs.append(result[1])
+            if progress: progress(done, len(futures), ticker)
+    screener.apply_batch_scores(rows, batch_inputs)
+    df = pd.DataFrame(rows, columns=["Ticker", *REPORT_COLUMNS]).astype(REPORT_COLUMNS).set_index("Ticker")
+    return df.reindex([t for t in tickers if t in df.index]), failed
+
+def write_report(df, out_dir, name, formats=FORMATS):
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for fmt in formats:
+        path = os.path.join(out_dir, f"{name}.{fmt}")
+        if fmt == "csv": df.to_csv(path)
+        elif fmt == "parquet": df.to_parquet(path)
+        elif fmt == "json": df.reset_index().to_json(path, orient="records", indent=2)
+        paths.append(path)
+    return paths
+
+def _progress(done, total, ticker):
+    print(f"[{done}/{total}] {ticker}", file=sys.stderr)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Relatório em lote (CSV/Parquet/JSON) sem abrir o dashboard")
+    parser.add_argument("tickers", nargs="*", metavar="TICKER")
+    parser.add_argument("--file", help="CSV (coluna Symbol/Ticker) ou lista de símbolos separados por vírgula/linha")
+    parser.add_argument("--portfolio", action="store_true", help="inclui os símbolos da carteira guardada")
+    parser.add_argument("--out", default="reports")
+    parser.add_argument("--name", default=None, help="nome base dos ficheiros (por omissão report-AAAAMMDD)")
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args(argv)
+
+    formats = [f.strip().lower() for f in args.formats.split(",") if f.strip()]
+    unknown = set(formats) - set(FORMATS)
+    if unknown: parser.error(f"formato desconhecido: {', '.join(sorted(unknown))}")
+    csv_bytes = None
+    if args.file:
+        with open(args.file, "rb") as f: csv_bytes = f.read()
+    tickers = screener.parse_universe(" ".join(args.tickers), csv_bytes)
+    if args.portfolio: tickers = list(dict.fromkeys([*tickers, *portfolio.load_holdings().index]))
+    if not tickers: parser.error("nenhum símbolo")
+
+    start = time.monotonic()
+    df, failed = build_report(tickers, args.workers, _progress)
+    for path in write_report(df, args.out, args.name or time.strftime("report-%Y%m%d"), formats): print(path)
+    for ticker, error in failed.items(): print(f"FAILED {ticker}: {error}", file=sys.stderr)
+    print(f"{len(df)}/{len(tickers)} tickers em {time.monotonic() - start:.1f}s", file=sys.stderr)
+    return 0 if len(df) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
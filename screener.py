@@ -0,0 +1,106 @@
+import csv
+import io
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import market_data
+import metrics
+from metrics import altman_z_panel, fair_value_batch, get_metric_status, growth_estimate, latest_valid, safe_get
+
+# --- UNIVERSE SCREENER ---
+MAX_WORKERS = 8
+
+SCREENER_COLUMNS = {
+    "Name": "object", "Sector": "object", "Price": "float64", "Yield%": "float64", "Payout%": "float64",
+    "Payout Status": "object", "ND/EBITDA": "float64", "Debt Status": "object", "Int Cov": "float64",
+    "ROIC%": "float64", "Insider Net 12M": "float64", "Altman Z": "float64", "Altman Z FY": "Int64", "Altman Z Δ": "float64",
+    "Moat Score": "Int64", "Moat": "object",
+    "Lynch": "float64", "Graham": "float64", "Graham Upside%": "float64", "Missing": "object",
+}
+# Colunas calculadas a partir de cada dataset: num bundle parcial ficam vazias (NaN) em vez de
+# mostrarem o 0 do valor por omissão, e a coluna Missing diz o que faltou
+MISSING_DEPENDS = {
+    "info": ("Yield%", "Payout%", "Payout Status", "Debt Status", "Moat Score", "Moat", "Altman Z", "Altman Z FY",
+             "Altman Z Δ", "Lynch", "Graham", "Graham Upside%"),
+    "financials": ("ND/EBITDA", "Debt Status", "Int Cov", "ROIC%", "Moat Score", "Moat", "Altman Z", "Altman Z FY", "Altman Z Δ"),
+    "balance": ("ND/EBITDA", "Debt Status", "ROIC%", "Moat Score", "Moat", "Altman Z", "Altman Z FY", "Altman Z Δ"),
+    "q_cashflow": ("Payout%", "Payout Status"),
+    "insider": ("Insider Net 12M",),
+}
+
+def parse_universe(text="", csv_bytes=None):
+    symbols = [s for s in re.split(r'[\s,;]+', text or "") if s]
+    if csv_bytes:
+        rows = list(csv.reader(io.StringIO(csv_bytes.decode('utf-8-sig'))))
+        if rows:
+            header = [h.strip().lower() for h in rows[0]]
+            col = next((header.index(h) for h in ('symbol', 'ticker') if h in header), None)
+            body = rows[1:] if col is not None else rows
+            symbols += [r[col or 0] for r in body if r and r[col or 0].strip()]
+    return list(dict.fromkeys(s.strip().upper() for s in symbols))
+
+# Scoring por ticker (moat, payout, dívida) + inputs mínimos para o passo em lote (Altman Z, Lynch/Graham)
+def score_bundle(ticker, bundle, m=None):
+    if m is None: m = metrics.compute_metrics(bundle)
+    info = bundle.get('info') or {}
+    lines = bundle.get('lines', {})
+    payout_txt, _ = get_metric_status(m['payout'], m['is_reit'], 'payout') if m['has_dividends'] else (None, "off")
+    debt_txt, _ = get_metric_status(m['nd_ebitda'], m['is_reit'], 'net_debt_ebitda')
+    row = {
+        "Ticker": ticker, "Name": safe_get(info, 'longName', ticker), "Sector": safe_get(info, 'sector', 'N/A'),
+        "Price": m['price'], "Yield%": m['div_yield'], "Payout%": m['payout'], "Payout Status": payout_txt,
+        "ND/EBITDA": m['nd_ebitda'], "Debt Status": debt_txt, "Int Cov": m['int_cov'], "ROIC%": m['roic'],
+        "Insider Net 12M": m['insider_net_value'], "Moat Score": m['total_score'], "Moat": m['moat_verdict'],
+    }
+    batch_inputs = {
+        "lines": {'balance': lines.get('balance', {}), 'financials': lines.get('financials', {})},
+        "market_cap": safe_get(info, 'marketCap', 0), "eps": safe_get(info, 'trailingEps', np.nan),
+        "growth": growth_estimate(info), "z_applicable": not m['is_reit'] and 'financial' not in m['sector'],
+        "missing": list(bundle.get('missing', [])),
+    }
+    return row, batch_inputs
+
+def score_ticker(ticker):
+    try:
+        bundle = market_data.load_bundle(ticker)
+        if bundle is None: return None
+        return score_bundle(ticker, bundle)
+    except Exception: return None
+
+def apply_batch_scores(rows, batch_inputs):
+    if not rows: return
+    z = altman_z_panel([b['lines'] for b in batch_inputs], np.array([b['market_cap'] for b in batch_inputs], dtype=float))
+    applicable = np.array([b['z_applicable'] for b in batch_inputs])
+    z_values, z_years = latest_valid(z)
+    z_latest = np.where(applicable, z_values.to_numpy(), np.nan)
+    z_year = np.where(applicable & ~np.isnan(z_latest), z_years.to_numpy(), np.nan)
+    z_first = np.where(applicable, z.bfill(axis=1).iloc[:, 0].to_numpy() if z.shape[1] else np.nan, np.nan)
+    lynch, graham = fair_value_batch([b['eps'] for b in batch_inputs], [b['growth'] for b in batch_inputs])
+    price = np.array([r['Price'] for r in rows], dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        upside = np.where((graham > 0) & (price > 0), (graham - price) / price * 100, np.nan)
+    for i, row in enumerate(rows):
+        row.update({"Altman Z": z_latest[i], "Altman Z FY": z_year[i], "Altman Z Δ": z_latest[i] - z_first[i],
+                    "Lynch": lynch[i], "Graham": graham[i], "Graham Upside%": upside[i]})
+        mask_missing(row, batch_inputs[i].get('missing', []))
+
+def mask_missing(row, missing):
+    row["Missing"] = ",".join(missing) or None
+    for name in missing:
+        for col in MISSING_DEPENDS.get(name, ()):
+            row[col] = None if SCREENER_COLUMNS[col] == "object" else np.nan
+
+def screen_universe(tickers, max_workers=MAX_WORKERS, progress=None):
+    rows, batch_inputs = [], []
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="screener") as pool:
+        futures = [pool.submit(score_ticker, t) for t in tickers]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            if result is not None: rows.append(result[0]); batch_inputs.append(result[1])
+            if progress: progress(done, len(futures))
+    apply_batch_scores(rows, batch_inputs)
+    df = pd.DataFrame(rows, columns=["Ticker", *SCREENER_COLUMNS]).astype(SCREENER_COLUMNS).set_index("Ticker")
+    return df.sort_values(["Moat Score", "ROIC%"], ascending=False)
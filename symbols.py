@@ -0,0 +1,159 @@
+import bisect
+import csv
+import difflib
+import functools
+import os
+import re
+import sys
+
+import data_store
+import outbound
+import telemetry
+
+# --- SYMBOL INDEX ---
+# Índice local (ticker + palavras do nome) construído uma vez por processo a partir de um ficheiro
+# de listagens; só as pesquisas sem resultado local vão ao endpoint do Yahoo (com LRU).
+LISTINGS_PATH = os.environ.get(
+    "DASHBOARD_LISTINGS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "listings.csv")
+)
+NASDAQ_LISTINGS_URL = "https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqtraded.txt"
+SEARCH_URL = "https://query2.finance.yahoo.com/v1/finance/search?q={query}"
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+REMOTE_CACHE_SIZE = 512
+FUZZY_CUTOFF = 0.75
+
+# Palavras que não distinguem empresas ("The Coca-Cola Company" -> "coca cola")
+STOPWORDS = {"the", "inc", "incorporated", "corp", "corporation", "company", "co", "plc", "ltd", "limited",
+             "sa", "nv", "ag", "se", "lp", "group", "holdings", "holding", "class", "and", "of"}
+
+def _tokens(text):
+    words = re.sub(r"[^a-z0-9]+", " ", str(text).lower().replace("&", " and ")).split()
+    return [w for w in words if w not in STOPWORDS] or words
+
+def _read_listings(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        sample = f.readline()
+        f.seek(0)
+        reader = csv.DictReader(f, delimiter="|" if "|" in sample else ",")
+        for row in reader:
+            symbol = (row.get("Symbol") or row.get("NASDAQ Symbol") or "").strip()
+            name = (row.get("Name") or row.get("Security Name") or "").strip()
+            if symbol and name and row.get("Test Issue", "N") != "Y": yield symbol.replace(".", "-"), name
+
+@functools.lru_cache(maxsize=1)
+def _index():
+    entries, by_symbol, postings = [], {}, {}
+    try: listings = list(_read_listings(LISTINGS_PATH))
+    except OSError: listings = []
+    for symbol, name in listings:
+        if symbol in by_symbol: continue
+        pos = len(entries)
+        entries.append((symbol, name))
+        by_symbol[symbol] = pos
+        for token in {symbol.lower(), *_tokens(name)}: postings.setdefault(token, []).append(pos)
+    vocabulary = sorted(postings)
+    return entries, by_symbol, postings, vocabulary
+
+def _prefix_matches(token):
+    _, _, postings, vocabulary = _index()
+    matched = set()
+    start = bisect.bisect_left(vocabulary, token)
+    for word in vocabulary[start:]:
+        if not word.startswith(token): break
+        matched.update(postings[word])
+    return matched
+
+# Só compara com palavras da mesma inicial: mantém o difflib abaixo de 1 ms com a listagem completa
+def _fuzzy_matches(token):
+    _, _, postings, vocabulary = _index()
+    block = vocabulary[bisect.bisect_left(vocabulary, token[0]):bisect.bisect_left(vocabulary, chr(ord(token[0]) + 1))]
+    matched = set()
+    for word in difflib.get_close_matches(token, block, n=3, cutoff=FUZZY_CUTOFF): matched.update(postings[word])
+    return matched
+
+def _candidates(tokens):
+    candidates = None
+    for token in tokens:
+        matched = _prefix_matches(token) or _fuzzy_matches(token)
+        candidates = matched if candidates is None else candidates & matched
+        if not candidates: return set()
+    return candidates
+
+# Todas as palavras da pesquisa têm de bater (por prefixo; se nenhuma bater, com tolerância a erros)
+def suggest(query, limit=8):
+    entries, _, _, _ = _index()
+    tokens = _tokens(query)
+    if not tokens: return []
+    # "jp morgan" -> "jpmorgan"
+    candidates = _candidates(tokens) or (_candidates(["".join(tokens)]) if len(tokens) > 1 else set())
+    q = query.strip().upper()
+    # Ticker exato, depois tickers com esse prefixo, depois a ordem do ficheiro (mais relevantes no topo)
+    ranked = sorted(candidates, key=lambda pos: (entries[pos][0] != q, not entries[pos][0].startswith(q), pos))
+    return [entries[pos] for pos in ranked[:limit]]
+
+def name_of(symbol):
+    entries, by_symbol, _, _ = _index()
+    pos = by_symbol.get(symbol.upper())
+    return entries[pos][1] if pos is not None else None
+
+# requests só é importado quando é preciso ir à rede (a landing page usa apenas o índice local)
+def _get_search(query):
+    import requests
+    with telemetry.timed("http", "yahoo_search", query=query):
+        response = requests.get(SEARCH_URL.format(query=query), headers=HEADERS, timeout=5)
+        response.raise_for_status()
+        return response.json().get('quotes') or []
+
+class NoMatch(LookupError):
+    pass
+
+def _search(query):
+    quotes = outbound.request("yahoo", f"search:{query}", lambda: _get_search(query))
+    if not quotes: raise NoMatch(query)
+    return quotes[0]['symbol']
+
+# LRU do processo à frente do store partilhado (uma pesquisa por query em todas as réplicas). "Sem
+# resultado" é uma exceção: o lru_cache não a memoriza e no store fica só o tempo de "symbol_miss".
+@functools.lru_cache(maxsize=REMOTE_CACHE_SIZE)
+def _remote_lookup(query):
+    if data_store.load(query, "symbol_miss", default=False): raise NoMatch(query)
+    try: symbol = data_store.fetch_shared(query, "symbol_search", lambda: _search(query))
+    except NoMatch:
+        data_store.save(query, "symbol_miss", True)
+        raise
+    # Entradas antigas do store podem ter guardado None
+    if symbol is None: raise NoMatch(query)
+    return symbol
+
+def resolve(query):
+    query = query.strip()
+    if not query: return None
+    if name_of(query): return query.upper()
+    matches = suggest(query, limit=1)
+    if matches:
+        telemetry.count("symbol_lookup", result="local")
+        return matches[0][0]
+    telemetry.count("symbol_lookup", result="remote")
+    try: return _remote_lookup(query.lower())
+    except Exception: return None
+
+def _get_listings():
+    import requests
+    response = requests.get(NASDAQ_LISTINGS_URL, headers=HEADERS, timeout=30)
+    response.raise_for_status()
+    return response.text
+
+# python symbols.py --refresh -> substitui listings.csv pela listagem completa da Nasdaq Trader
+def refresh_listings(path=LISTINGS_PATH):
+    rows = [line.split("|") for line in outbound.request("nasdaqtrader", "listings", _get_listings).splitlines()]
+    header = rows[0]
+    sym, name, etf, test = (header.index(c) for c in ("Symbol", "Security Name", "ETF", "Test Issue"))
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Symbol", "Name", "Exchange"])
+        for r in rows[1:]:
+            if len(r) == len(header) and r[test] == "N": writer.writerow([r[sym], r[name], "ETF" if r[etf] == "Y" else ""])
+    _index.cache_clear()
+
+if __name__ == "__main__" and "--refresh" in sys.argv:
+    refresh_listings()
@@ -0,0 +1,109 @@
+import atexit
+import contextlib
+import json
+import os
+import queue
+import threading
+import time
+from collections import Counter, deque
+
+import pandas as pd
+
+# --- HOT-PATH INSTRUMENTATION ---
+# Cada etapa / chamada externa gera um evento {ts, kind, name, ms, status, error, labels...}.
+# Os eventos ficam num buffer em memória (painel de debug) e, se DASHBOARD_METRICS_LOG estiver
+# definido, são acrescentados como JSON lines a esse ficheiro para serem recolhidos.
+METRICS_LOG = os.environ.get("DASHBOARD_METRICS_LOG")
+MAX_EVENTS = 5000
+PERCENTILES = (0.5, 0.95, 0.99)
+# Labels que não entram na chave dos contadores (um contador por ticker cresceria sem limite);
+# continuam nos eventos, que têm buffer limitado
+COUNTER_EXCLUDE = ("ticker",)
+# Eventos à espera de ir para o ficheiro: se o disco não acompanhar, os excedentes são descartados
+MAX_PENDING = 10000
+
+_lock = threading.Lock()
+_events = deque(maxlen=MAX_EVENTS)
+_counters = Counter()
+
+# --- METRICS FILE ---
+# Uma thread escreve o ficheiro em lotes: os threads instrumentados só põem o evento na fila
+_pending = queue.Queue(maxsize=MAX_PENDING)
+_writer = None
+_writer_lock = threading.Lock()
+
+def _write(batch):
+    try:
+        with open(METRICS_LOG, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(event, default=str) + "\n" for event in batch))
+    except OSError: pass
+
+def _drain(batch):
+    while True:
+        try: batch.append(_pending.get_nowait())
+        except queue.Empty: return batch
+
+def _write_loop():
+    while True: _write(_drain([_pending.get()]))
+
+def _flush():
+    batch = _drain([])
+    if batch: _write(batch)
+
+def _start_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is not None: return
+        _writer = threading.Thread(target=_write_loop, name="telemetry-writer", daemon=True)
+        _writer.start()
+        atexit.register(_flush)
+
+def _emit(event):
+    with _lock: _events.append(event)
+    if not METRICS_LOG: return
+    if _writer is None: _start_writer()
+    try: _pending.put_nowait(event)
+    except queue.Full:
+        with _lock: _counters[("telemetry_dropped", ())] += 1
+
+def record(kind, name, ms, status="ok", error=None, **labels):
+    _emit({"ts": time.time(), "kind": kind, "name": name, "ms": round(ms, 3), "status": status, "error": error, **labels})
+
+@contextlib.contextmanager
+def timed(kind, name, **labels):
+    start = time.perf_counter()
+    status, error = "ok", None
+    try: yield
+    except BaseException as exc:
+        status, error = "error", f"{type(exc).__name__}: {exc}"[:200]
+        raise
+    finally: record(kind, name, (time.perf_counter() - start) * 1000, status, error, **labels)
+
+def count(name, n=1, **labels):
+    key = (name, tuple(sorted((k, v) for k, v in labels.items() if k not in COUNTER_EXCLUDE)))
+    with _lock: _counters[key] += n
+    _emit({"ts": time.time(), "kind": "counter", "name": name, "value": n, **labels})
+
+# --- SUMMARIES ---
+def events(since=None):
+    with _lock: snapshot = list(_events)
+    return [e for e in snapshot if since is None or e["ts"] >= since]
+
+def latency_table(since=None, by=("kind", "name", "ticker")):
+    df = pd.DataFrame([e for e in events(since) if e["kind"] != "counter"])
+    columns = [*by, "calls", "errors", "p50 ms", "p95 ms", "p99 ms", "max ms"]
+    if df.empty: return pd.DataFrame(columns=columns)
+    by = list(by)
+    for col in by:
+        df[col] = df[col].fillna("") if col in df else ""
+    grouped = df.groupby(by)
+    table = pd.DataFrame({"calls": grouped.size(), "errors": grouped["status"].apply(lambda s: int((s != "ok").sum()))})
+    for q in PERCENTILES: table[f"p{int(q * 100)} ms"] = grouped["ms"].quantile(q)
+    table["max ms"] = grouped["ms"].max()
+    return table.reset_index().sort_values("p95 ms", ascending=False)[columns]
+
+def counter_table():
+    with _lock: snapshot = dict(_counters)
+    rows = [{"counter": name, "labels": ", ".join(f"{k}={v}" for k, v in labels), "value": value}
+            for (name, labels), value in snapshot.items()]
+    return pd.DataFrame(rows, columns=["counter", "labels", "value"]).sort_values(["counter", "labels"], ignore_index=True)